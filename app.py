@@ -1,5 +1,6 @@
 import os
 import logging
+import requests
 from datetime import datetime
 from flask import Flask, render_template, request, jsonify, flash, redirect, url_for
 from werkzeug.utils import secure_filename
@@ -8,7 +9,13 @@ from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.orm import DeclarativeBase
 import json
 
+from clause_index import find_clause_reference
+from dense_index import make_encoder
 from document_processor import DocumentProcessor
+from extraction_cache import ExtractionCache
+from keyword_matcher import KeywordMatcher, load_dictionaries
+from retrieval_scheduler import RetrievalScheduler
+from search_filters import SearchFilters
 from vector_store import VectorStore
 from llm_client import LLMClient
 from translation_service import TranslationService
@@ -33,6 +40,9 @@ ALLOWED_EXTENSIONS = {'pdf'}
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 
+# Documents fetched by URL (HackRX API) are held in memory, so cap their size
+MAX_DOWNLOAD_BYTES = int(os.environ.get('MAX_DOWNLOAD_MB', 32)) * 1024 * 1024
+
 # Ensure upload directory exists
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs('vector_db', exist_ok=True)
@@ -47,18 +57,106 @@ app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
 # Initialize the app with the extension
 db.init_app(app)
 
+# PDF extraction settings: worker processes for large documents, serial below the page threshold.
+# Serial by default: every gunicorn worker starts its own pool, so size this as
+# (cores / gunicorn workers) when opting in
+PDF_WORKERS = int(os.environ.get('PDF_WORKERS', 1))
+PDF_PARALLEL_MIN_PAGES = int(os.environ.get('PDF_PARALLEL_MIN_PAGES', 24))
+
+# Extraction cache so re-uploads of the same PDF skip parsing
+EXTRACTION_CACHE_DIR = os.environ.get('EXTRACTION_CACHE_DIR', 'extraction_cache')
+EXTRACTION_CACHE_MAX_MB = int(os.environ.get('EXTRACTION_CACHE_MAX_MB', 256))
+
+# Ranking engine: 'tfidf' (cosine over the TF-IDF matrix), 'bm25' (inverted index),
+# 'dense' (FAISS over embeddings from DENSE_ENCODER) or 'hybrid' (TF-IDF and dense
+# fused by reciprocal rank)
+RETRIEVAL_ENGINE = os.environ.get('RETRIEVAL_ENGINE', 'tfidf').lower()
+
+# Embedding encoder for dense retrieval: 'hashing' (deterministic, for tests) or a
+# local sentence-transformers model directory; empty disables embeddings
+DENSE_ENCODER = os.environ.get('DENSE_ENCODER', 'hashing' if RETRIEVAL_ENGINE in ('dense', 'hybrid') else '')
+
+# Retrieved chunks included in each LLM prompt
+LLM_CONTEXT_DOCS = int(os.environ.get('LLM_CONTEXT_DOCS', 3))
+
+# Compact TF-IDF storage for large corpora: weights as 'float64' (exact), 'float32'
+# or 'uint8' (8-bit with a per-row scale), and bigrams found in fewer than
+# MIN_BIGRAM_DF chunks left out of the matrix (1 keeps all). See
+# benchmarks/bench_compact_index.py for the memory/recall trade-off
+VECTOR_DTYPE = os.environ.get('VECTOR_DTYPE', 'float64').lower()
+MIN_BIGRAM_DF = int(os.environ.get('MIN_BIGRAM_DF', 1))
+
+# TF-IDF vocabulary bounds: terms found in more than MAX_DF of the chunks are
+# left out of the matrix (1.0 keeps all; the batch vectorizer used 0.9), and
+# the vocabulary stops growing at MAX_FEATURES terms (0 for no limit)
+MAX_DF = float(os.environ.get('MAX_DF', 1.0))
+MAX_FEATURES = int(os.environ.get('MAX_FEATURES', 2_000_000))
+
+# Search results kept per worker for repeated questions; 0 disables the cache
+QUERY_CACHE_SIZE = int(os.environ.get('QUERY_CACHE_SIZE', 1024))
+
+# Concurrent /query searches (threaded workers) are scored together, up to
+# RETRIEVAL_MAX_BATCH at a time: queries arriving while a batch runs form the
+# next one. RETRIEVAL_BATCH_WINDOW_MS > 0 also lets a batch wait that long for
+# more arrivals once several are queued. A lone query is never delayed.
+RETRIEVAL_MAX_BATCH = int(os.environ.get('RETRIEVAL_MAX_BATCH', 16))
+RETRIEVAL_BATCH_WINDOW_MS = float(os.environ.get('RETRIEVAL_BATCH_WINDOW_MS', 0))
+
+# Optional JSON file of keyword dictionaries ({"name": ["term", ...]}) replacing
+# or extending the built-in ones used for chunk filtering and query parsing
+KEYWORD_DICTIONARIES = os.environ.get('KEYWORD_DICTIONARIES', '')
+
 # Initialize processors
-document_processor = DocumentProcessor()
-vector_store = VectorStore()
-llm_client = LLMClient()
+keyword_matcher = KeywordMatcher(load_dictionaries(KEYWORD_DICTIONARIES))
+extraction_cache = ExtractionCache(EXTRACTION_CACHE_DIR, max_bytes=EXTRACTION_CACHE_MAX_MB * 1024 * 1024)
+document_processor = DocumentProcessor(max_workers=PDF_WORKERS, parallel_min_pages=PDF_PARALLEL_MIN_PAGES,
+                                       cache=extraction_cache)
+vector_store = VectorStore(retrieval_engine=RETRIEVAL_ENGINE, encoder=make_encoder(DENSE_ENCODER),
+                           query_cache_size=QUERY_CACHE_SIZE, keyword_matcher=keyword_matcher,
+                           vector_dtype=VECTOR_DTYPE, min_bigram_df=MIN_BIGRAM_DF,
+                           max_df=MAX_DF, max_features=MAX_FEATURES or None)
+retrieval_scheduler = RetrievalScheduler(vector_store.search_many, max_batch=RETRIEVAL_MAX_BATCH,
+                                         max_wait_ms=RETRIEVAL_BATCH_WINDOW_MS)
+llm_client = LLMClient(context_docs=LLM_CONTEXT_DOCS, keyword_matcher=keyword_matcher)
 translation_service = TranslationService()
 
-# Clear any existing vector store on startup for fresh sessions
-vector_store.clear_all_documents()
+# Start each deployment with a fresh session. This publishes an empty index
+# generation, so it must run once per deployment, not once per worker: under
+# gunicorn's preload_app it runs in the master before workers fork. Set
+# CLEAR_INDEX_ON_STARTUP=false to keep the published index across restarts.
+if os.environ.get('CLEAR_INDEX_ON_STARTUP', 'true').lower() in ('1', 'true', 'yes'):
+    vector_store.clear_all_documents()
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+class DownloadTooLargeError(Exception):
+    pass
+
+def download_pdf(url, max_bytes):
+    """
+    Stream a document into memory, aborting as soon as it exceeds max_bytes
+    """
+    with requests.get(url, timeout=30, stream=True) as response:
+        response.raise_for_status()
+
+        declared_length = response.headers.get('Content-Length', '')
+        if declared_length.isdigit() and int(declared_length) > max_bytes:
+            raise DownloadTooLargeError(f'Document is larger than the {max_bytes // (1024 * 1024)}MB limit')
+
+        buffer = bytearray()
+        for block in response.iter_content(chunk_size=64 * 1024):
+            buffer.extend(block)
+            if len(buffer) > max_bytes:
+                raise DownloadTooLargeError(f'Document is larger than the {max_bytes // (1024 * 1024)}MB limit')
+
+    return bytes(buffer)
+
+@app.before_request
+def refresh_vector_store():
+    # Pick up index generations published by other workers between requests
+    vector_store.refresh()
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -69,16 +167,8 @@ def upload_files():
         if 'files' not in request.files:
             return jsonify({'error': 'No files selected'}), 400
 
-        # Clear previous uploads for this session
-        import glob
-        for old_file in glob.glob(os.path.join(app.config['UPLOAD_FOLDER'], '*')):
-            if os.path.isfile(old_file) and not old_file.endswith('.gitkeep'):
-                os.remove(old_file)
-
-        # Clear vector store for new session/upload
-        vector_store.clear_all_documents()
-        logger.info("Cleared vector store for new document upload session")
-
+        # Uploads accumulate: new documents are appended to the vector store,
+        # and only /new-chat starts over with an empty one
         files = request.files.getlist('files')
         uploaded_files = []
 
@@ -90,16 +180,20 @@ def upload_files():
                 filename = secure_filename(file.filename)
                 filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
                 file.save(filepath)
+                uploaded_files.append(filename)
 
-                # Process the document
-                logger.info(f"Processing document: {filename}")
-                chunks = document_processor.process_pdf(filepath, filename)
-
-                # Add to vector store
-                vector_store.add_documents(chunks)
+        if uploaded_files:
+            # Stream every document's chunks into the vector store in one pass;
+            # passages repeated across files (this upload or earlier ones) are
+            # indexed only once
+            def iter_uploaded_chunks():
+                for filename in uploaded_files:
+                    logger.info(f"Processing document: {filename}")
+                    yield from document_processor.iter_chunks(
+                        os.path.join(app.config['UPLOAD_FOLDER'], filename), filename)
+                    logger.info(f"Successfully processed: {filename}")
 
-                uploaded_files.append(filename)
-                logger.info(f"Successfully processed: {filename}")
+            vector_store.add_documents(iter_uploaded_chunks())
 
         if not uploaded_files:
             return jsonify({'error': 'No valid PDF files uploaded'}), 400
@@ -127,6 +221,12 @@ def process_query():
         selected_language = data.get('language', 'en-IN')
         logger.info(f"Processing query: {user_query} in language: {selected_language}")
 
+        # Optional scope from the UI, e.g. {"sources": ["policy.pdf"]}; only matching chunks are searched
+        try:
+            filters = SearchFilters.from_dict(data.get('filters'))
+        except ValueError as e:
+            return jsonify({'error': f'Invalid filters: {str(e)}'}), 400
+
         # Translate query to English if it's in a regional language
         translated_query = user_query
         is_regional_language = selected_language != 'en-IN'
@@ -151,9 +251,16 @@ def process_query():
                 'message_type': 'no_documents'
             })
 
-        # Retrieve relevant documents using translated query
-        logger.info("Searching for relevant documents...")
-        relevant_docs = vector_store.search_documents(search_query, k=10)
+        # Questions citing a clause number go straight to that clause, skipping retrieval
+        relevant_docs = []
+        clause_number = find_clause_reference(search_query)
+        if clause_number:
+            relevant_docs = vector_store.find_clause(clause_number, k=10, filters=filters)
+
+        if not relevant_docs:
+            # Retrieve relevant documents using translated query
+            logger.info("Searching for relevant documents...")
+            relevant_docs = retrieval_scheduler.search(search_query, k=10, filters=filters)
         logger.info(f"Found {len(relevant_docs)} relevant documents")
 
         if not relevant_docs:
@@ -271,12 +378,32 @@ def get_status():
         return jsonify({
             'status': 'ready',
             'documents_loaded': doc_count,
-            'vector_store_ready': doc_count > 0
+            'vector_store_ready': doc_count > 0,
+            'documents': vector_store.get_sources()
         })
     except Exception as e:
         logger.error(f"Error getting status: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/metrics')
+def get_metrics():
+    try:
+        return jsonify({
+            'extraction_cache': extraction_cache.stats(),
+            'index': {
+                'generation': vector_store.generation,
+                'retrieval_engine': vector_store.retrieval_engine,
+                'search_stages': vector_store.timings.stats(),
+                'query_cache': vector_store.query_cache.stats(),
+                'retrieval_batches': retrieval_scheduler.stats(),
+                'tfidf_matrix': vector_store.matrix_stats(),
+                'documents': vector_store.get_document_count()
+            }
+        })
+    except Exception as e:
+        logger.error(f"Error getting metrics: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/webhook/document-upload', methods=['POST'])
 def webhook_document_upload():
     """Webhook endpoint for document upload notifications"""
@@ -363,40 +490,29 @@ def hackrx_run():
             
         if not questions or not isinstance(questions, list):
             return jsonify({'error': 'Questions must be a non-empty list'}), 400
+
+        if not all(isinstance(question, str) for question in questions):
+            return jsonify({'error': 'Every question must be a string'}), 400
         
         logger.info(f"Processing document URL: {documents_url}")
         logger.info(f"Number of questions: {len(questions)}")
         
-        # Download and process the document
-        import requests
-        import tempfile
-        import os
-        
         # Clear previous documents
         vector_store.clear_all_documents()
         
-        # Download the document
+        # Download the document straight into memory and process it from there
         try:
-            response = requests.get(documents_url, timeout=30)
-            response.raise_for_status()
-            
-            # Save to temporary file
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
-                temp_file.write(response.content)
-                temp_filepath = temp_file.name
+            pdf_bytes = download_pdf(documents_url, MAX_DOWNLOAD_BYTES)
             
             # Process the PDF
             filename = 'downloaded_policy.pdf'
-            chunks = document_processor.process_pdf(temp_filepath, filename)
+            vector_store.add_documents(document_processor.iter_chunks_from_bytes(pdf_bytes, filename))
             
-            # Add to vector store
-            vector_store.add_documents(chunks)
-            
-            # Clean up temp file
-            os.unlink(temp_filepath)
-            
-            logger.info(f"Successfully processed document with {len(chunks)} chunks")
+            logger.info(f"Successfully processed document with {vector_store.get_document_count()} chunks")
             
+        except DownloadTooLargeError as e:
+            logger.error(f"Document too large: {str(e)}")
+            return jsonify({'error': str(e)}), 413
         except requests.RequestException as e:
             logger.error(f"Error downloading document: {str(e)}")
             return jsonify({'error': f'Failed to download document: {str(e)}'}), 400
@@ -404,16 +520,16 @@ def hackrx_run():
             logger.error(f"Error processing document: {str(e)}")
             return jsonify({'error': f'Failed to process document: {str(e)}'}), 500
         
+        # Search for every question's relevant documents in one batched pass
+        all_relevant_docs = vector_store.search_many(questions, k=10)
+
         # Process each question
         answers = []
         
-        for question in questions:
+        for question, relevant_docs in zip(questions, all_relevant_docs):
             try:
                 logger.info(f"Processing question: {question}")
                 
-                # Search for relevant documents
-                relevant_docs = vector_store.search_documents(question, k=10)
-                
                 if not relevant_docs:
                     logger.warning(f"No relevant documents found for question: {question}")
                     answers.append("I couldn't find relevant information in the document to answer this question.")
@@ -0,0 +1,95 @@
+"""
+Micro-benchmark: offset-based chunker vs the previous string-concatenation chunker
+
+Run from the repository root: python benchmarks/bench_chunker.py [pages]
+"""
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from document_processor import DocumentProcessor
+
+WORDS = ("policy insured hospitalization claim benefit surgery waiting period premium treatment "
+         "covered excluded expenses disease sum insured deductible co-pay cashless network the of "
+         "and to in for is that with any such shall be under this").split()
+
+
+def make_page(rng: random.Random, page_num: int) -> str:
+    parts = []
+    for section in range(4):
+        parts.append(f"Section {page_num}.{section + 1}: {rng.choice(WORDS).title()} {rng.choice(WORDS)} cover.")
+        for _ in range(rng.randint(5, 9)):
+            sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 24)))
+            parts.append(sentence.capitalize() + rng.choice(".!?"))
+    return " ".join(parts)
+
+
+def legacy_create_chunks(processor: DocumentProcessor, text: str, page_num: int, filename: str):
+    """
+    The previous chunker: string concatenation, a clause scan per chunk, no overlap
+    """
+    def extract_clause_info(chunk_text):
+        clause_info = {'title': '', 'number': ''}
+        for pattern in [r'(?:Clause|Section|Article)\s+(\d+(?:\.\d+)*)\s*:?\s*([^\n.]+)',
+                        r'(\d+(?:\.\d+)*)\.\s*([A-Z][^.]+)',
+                        r'([A-Z][^.]+)\s*-\s*Clause\s+(\d+(?:\.\d+)*)']:
+            match = re.search(pattern, chunk_text, re.IGNORECASE)
+            if match:
+                clause_info['number'] = match.group(1)
+                clause_info['title'] = match.group(2).strip()
+                break
+        return clause_info
+
+    chunks = []
+    current_chunk = ""
+    for sentence in re.split(r'(?<=[.!?])\s+', text):
+        if len(current_chunk) + len(sentence) > processor.chunk_size and current_chunk:
+            clause_info = extract_clause_info(current_chunk)
+            chunks.append({'text': current_chunk.strip(), 'metadata': {
+                'source': filename, 'page': page_num, 'clause_title': clause_info['title'],
+                'clause_number': clause_info['number'], 'chunk_id': len(chunks)}})
+            current_chunk = sentence + " "
+        else:
+            current_chunk += sentence + " "
+    if current_chunk.strip():
+        clause_info = extract_clause_info(current_chunk)
+        chunks.append({'text': current_chunk.strip(), 'metadata': {
+            'source': filename, 'page': page_num, 'clause_title': clause_info['title'],
+            'clause_number': clause_info['number'], 'chunk_id': len(chunks)}})
+    return chunks
+
+
+def run(label, fn, pages):
+    start = time.perf_counter()
+    chunks = 0
+    chars = 0
+    for page_num, text in enumerate(pages, 1):
+        for chunk in fn(text, page_num):
+            chunks += 1
+            chars += len(chunk['text'])
+    elapsed = time.perf_counter() - start
+    print(f"{label:<10} {elapsed * 1000:9.1f} ms  {len(pages) / elapsed:9.0f} pages/s  "
+          f"{chunks:7d} chunks  {chars / max(chunks, 1):7.0f} avg chars")
+
+
+def main():
+    page_count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    rng = random.Random(42)
+    pages = [make_page(rng, n) for n in range(1, page_count + 1)]
+    total_chars = sum(len(p) for p in pages)
+    print(f"{page_count} synthetic pages, {total_chars / 1e6:.1f}M chars")
+
+    processor = DocumentProcessor()
+    run('legacy', lambda text, n: legacy_create_chunks(processor, text, n, 'bench.pdf'), pages)
+    run('offsets', lambda text, n: processor._create_chunks(text, n, 'bench.pdf'), pages)
+
+    processor.chunk_overlap = 0
+    run('offsets/0', lambda text, n: processor._create_chunks(text, n, 'bench.pdf'), pages)
+
+
+if __name__ == '__main__':
+    main()
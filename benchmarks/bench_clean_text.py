@@ -0,0 +1,73 @@
+"""
+Benchmark: precompiled TextNormalizer vs the previous multi-pass _clean_text
+
+Run from the repository root: python benchmarks/bench_clean_text.py [pages]
+"""
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from document_processor import TextNormalizer
+
+WORDS = ("policy insured hospitalization claim benefit surgery waiting period premium treatment "
+         "covered excluded expenses disease sum insured deductible co-pay cashless network the of "
+         "and to in for is that with any such shall be under this").split()
+
+
+def make_page(rng: random.Random, page_num: int, page_count: int) -> str:
+    """
+    A page shaped like PyMuPDF output: ~60 short lines, a header, a footer and some dashes
+    """
+    lines = ["ACME General Insurance Co. Ltd.    UIN: ACMHLIP21001V012021", ""]
+    for _ in range(rng.randint(50, 70)):
+        line = " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 12)))
+        if rng.random() < 0.1:
+            line += " — " + rng.choice(WORDS)
+        lines.append(line.capitalize() + ("." if rng.random() < 0.3 else ""))
+    lines.append(f"Page {page_num} of {page_count}")
+    lines.append(str(page_num))
+    return "\n".join(lines) + "\n"
+
+
+def legacy_clean_text(text: str) -> str:
+    """
+    The previous _clean_text, minus its two quote replacements that never matched anything
+    """
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'Page \d+ of \d+', '', text)
+    text = re.sub(r'^\d+\s*$', '', text, flags=re.MULTILINE)
+    text = text.replace('—', '-')
+    return text.strip()
+
+
+def run(label, fn, pages):
+    start = time.perf_counter()
+    for text in pages:
+        fn(text)
+    elapsed = time.perf_counter() - start
+    chars = sum(len(p) for p in pages)
+    print(f"{label:<12} {elapsed * 1000:8.1f} ms  {len(pages) / elapsed:9.0f} pages/s  {chars / elapsed / 1e6:6.1f} MB/s")
+
+
+def main():
+    page_count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    rng = random.Random(7)
+    pages = [make_page(rng, n, page_count) for n in range(1, page_count + 1)]
+    # Edge cases: pages holding only their number, with and without leading whitespace
+    pages.extend(["12\n", "\n12\n", "12 Page 3 of 9\n", "Page 3 of 9 12", "\u00a0caf\u00e9\u2003\u2014 x"])
+    print(f"{len(pages)} pages, avg {sum(len(p) for p in pages) / len(pages):.0f} chars")
+
+    normalizer = TextNormalizer()
+    mismatches = sum(1 for p in pages if legacy_clean_text(p) != normalizer.normalize(p))
+    print(f"output mismatches: {mismatches}")
+
+    run('legacy', legacy_clean_text, pages)
+    run('normalizer', normalizer.normalize, pages)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark: memory and recall of the compact TF-IDF index modes
+
+Vectorizes a synthetic corpus (Zipf-distributed words, ~150 per chunk,
+added in several uploads like the incremental index) once per mode and
+reports the matrix size, the mean query time, and the recall@10 against
+the exact float64 matrix with every bigram kept. Queries are 6-word
+phrases taken from random chunks, so bigrams matter for their ranking.
+
+Modes combine the weight dtype (float64, float32, uint8 with a per-row
+scale) with MIN_BIGRAM_DF (bigrams seen in fewer chunks are not stored).
+
+Run from the repository root: python benchmarks/bench_compact_index.py [chunks] [queries]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+from scipy.sparse import vstack
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from incremental_vectorizer import IncrementalTfidfVectorizer
+from scoring import score_rows, top_k
+from vector_quantization import encode_rows
+
+WORDS = 30_000
+WORDS_PER_CHUNK = 150
+UPLOADS = 10
+MODES = (('float64', 1), ('float32', 1), ('uint8', 1), ('float64', 2), ('float32', 2), ('uint8', 2), ('uint8', 3))
+
+
+def make_corpus(rng: np.random.Generator, chunks: int):
+    vocabulary = np.array([f"w{idx}" for idx in range(WORDS)])
+    words = vocabulary[(rng.zipf(1.15, chunks * WORDS_PER_CHUNK) - 1) % WORDS].reshape(chunks, WORDS_PER_CHUNK)
+    return [' '.join(chunk) for chunk in words]
+
+
+def build(texts, dtype: str, min_bigram_df: int):
+    """
+    The index as VectorStore builds it: one vectorizer grown upload by upload
+    """
+    vectorizer = IncrementalTfidfVectorizer()
+    blocks, scales = [], []
+    upload = -(-len(texts) // UPLOADS)
+    for start in range(0, len(texts), upload):
+        counts = vectorizer.partial_fit_counts(texts[start:start + upload])
+        vectors, row_scales = encode_rows(vectorizer.weight(vectorizer.prune_rare_bigrams(counts, min_bigram_df)),
+                                          dtype)
+        blocks.append(vectors)
+        if row_scales is not None:
+            scales.append(row_scales)
+    # Earlier uploads have no columns for terms first seen later
+    for block in blocks:
+        block.resize(block.shape[0], vectorizer.n_features)
+    return vectorizer, vstack(blocks, format='csr'), np.concatenate(scales) if scales else None
+
+
+def main():
+    chunks = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    queries = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    rng = np.random.default_rng(7)
+    texts = make_corpus(rng, chunks)
+    phrases = []
+    for row in rng.choice(chunks, queries, replace=False):
+        words = texts[row].split()
+        start = rng.integers(0, len(words) - 6)
+        phrases.append(' '.join(words[start:start + 6]))
+
+    print(f"{chunks} chunks, {queries} queries")
+    print(f"{'dtype':<8} {'min df':>6} {'entries':>10} {'MB':>8} {'vs f64':>7} {'query ms':>9} {'recall@10':>10}")
+    exact = None
+    for dtype, min_bigram_df in MODES:
+        vectorizer, matrix, scales = build(texts, dtype, min_bigram_df)
+        nbytes = matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes
+        nbytes += scales.nbytes if scales is not None else 0
+
+        query_vectors = vectorizer.transform(phrases)
+        start = time.perf_counter()
+        results = [top_k(score_rows(matrix, query_vectors[idx], scales), 10, min_score=0.01)[0]
+                   for idx in range(queries)]
+        elapsed = (time.perf_counter() - start) / queries
+
+        if exact is None:
+            exact, exact_bytes = results, nbytes
+        recall = np.mean([len(set(found.tolist()) & set(truth.tolist())) / len(truth)
+                          for found, truth in zip(results, exact) if len(truth)])
+        print(f"{dtype:<8} {min_bigram_df:>6} {matrix.nnz:>10} {nbytes / 2 ** 20:8.1f} "
+              f"{nbytes / exact_bytes:6.0%} {elapsed * 1000:9.2f} {recall:10.3f}")
+
+
+if __name__ == '__main__':
+    main()
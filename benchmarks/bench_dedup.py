@@ -0,0 +1,80 @@
+"""
+Benchmark and regression check: MinHash near-duplicate detection at ingest
+
+Runs the deduplicator over the chunks DocumentProcessor cuts from synthetic
+pages. Consecutive chunks share up to chunk_overlap characters but are
+distinct content, so every one of them must be kept. Then checks pairs of
+known similarity: distinct chunks (Jaccard ~0.2) must not collapse, and
+near-copies (one word changed) must. Exits non-zero when a check fails.
+
+Run from the repository root: python benchmarks/bench_dedup.py [pages] [pairs]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dedup import MinHashDeduplicator
+from document_processor import DocumentProcessor
+
+WORDS = ("policy insured hospitalization claim benefit surgery waiting period premium treatment "
+         "covered excluded expenses disease sum insured deductible co-pay cashless network the of "
+         "and to in for is that with any such shall be under this").split()
+
+
+def make_page(rng: random.Random) -> str:
+    sentences = []
+    for _ in range(rng.randint(20, 30)):
+        sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 24)))
+        sentences.append(sentence.capitalize() + ".")
+    return " ".join(sentences)
+
+
+def collapsed_pairs(rng: random.Random, pairs: int, changed_words: int) -> int:
+    """
+    How many of pairs (150-word chunk, copy with changed_words words replaced) collapse
+    """
+    collapsed = 0
+    for _ in range(pairs):
+        words = [rng.choice(WORDS) for _ in range(150)]
+        copy = list(words)
+        for position in rng.sample(range(len(words)), changed_words):
+            copy[position] = f"x{rng.randint(0, 10 ** 6)}"
+        deduplicator = MinHashDeduplicator()
+        deduplicator.find_or_add(" ".join(words), 0)
+        collapsed += deduplicator.find_or_add(" ".join(copy), 1) is not None
+    return collapsed
+
+
+def main():
+    page_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    pairs = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    rng = random.Random(42)
+    processor = DocumentProcessor()
+
+    chunks = []
+    for _ in range(page_count):
+        text = make_page(rng)
+        chunks.extend(text[start:end] for start, end in processor._chunk_spans(text))
+
+    deduplicator = MinHashDeduplicator()
+    start = time.perf_counter()
+    dropped = sum(deduplicator.find_or_add(chunk, key) is not None for key, chunk in enumerate(chunks))
+    elapsed = time.perf_counter() - start
+    print(f"{len(chunks)} overlapping chunks: {dropped} dropped as near-duplicates "
+          f"({elapsed / len(chunks) * 1e6:.0f} us per chunk)")
+
+    distinct = collapsed_pairs(rng, pairs, changed_words=30)
+    near_copies = collapsed_pairs(rng, pairs, changed_words=1)
+    print(f"distinct pairs (~30 of 150 words changed): {distinct}/{pairs} collapsed")
+    print(f"near-copies (1 of 150 words changed):      {near_copies}/{pairs} collapsed")
+
+    failed = dropped > 0 or distinct > pairs // 100 or near_copies < pairs * 0.95
+    print("FAILED" if failed else "OK")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
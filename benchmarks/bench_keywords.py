@@ -0,0 +1,101 @@
+"""
+Benchmark: chunk filtering with the compiled KeywordMatcher vs per-keyword substring scans
+
+Times VectorStore._is_relevant_content against the previous implementation
+(any() over 45 keywords, then the code regex and word count, always all
+three) on synthetic chunks: policy text that contains keywords early, and
+boilerplate (addresses, tables of figures) that contains none. A second
+table times keyword lookup alone as the dictionary grows: per-term scans
+cost grows with the number of terms, the compiled matcher's does not.
+
+Run from the repository root: python benchmarks/bench_keywords.py [chunks]
+"""
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from keyword_matcher import DEFAULT_DICTIONARIES, KeywordMatcher
+from vector_store import VectorStore
+
+POLICY_WORDS = ("policy insured hospitalization claim benefit surgery waiting period premium treatment "
+                "covered excluded expenses disease sum insured deductible co-pay cashless network the of "
+                "and to in for is that with any such shall be under this").split()
+BOILERPLATE_WORDS = ("road nagar street floor tower building mumbai www acme com phone toll free "
+                     "no dated ref annexure schedule table row column total").split()
+
+
+def make_chunk(rng: random.Random, words) -> str:
+    """
+    A chunk of ~150 words, the size DocumentProcessor produces
+    """
+    parts = []
+    for _ in range(150):
+        word = rng.choice(words)
+        parts.append(word.capitalize() if rng.random() < 0.1 else word)
+        if rng.random() < 0.05:
+            parts.append(str(rng.randint(1, 99999)))
+    return " ".join(parts)
+
+
+def legacy_is_relevant_content(text: str) -> bool:
+    """
+    The previous VectorStore._is_relevant_content
+    """
+    text_lower = text.lower()
+    if len(text.strip()) < 50:
+        return False
+    if re.match(r'^uin[\-\s]*[a-z0-9]+\s*$', text_lower.strip()):
+        return False
+    relevant_keywords = DEFAULT_DICTIONARIES['relevant_content']
+    has_relevant_content = any(keyword in text_lower for keyword in relevant_keywords)
+    has_medical_codes = bool(re.search(r'\d+\.\d+|\d+\s+[a-z].*?(surgery|procedure|treatment|removal|repair)', text_lower))
+    has_substantial_text = len([word for word in text.split() if len(word) > 2]) > 5
+    return has_relevant_content or has_medical_codes or (has_substantial_text and len(text.strip()) > 100)
+
+
+def timed(fn, texts) -> float:
+    start = time.perf_counter()
+    for text in texts:
+        fn(text)
+    return time.perf_counter() - start
+
+
+def make_terms(rng: random.Random, count: int):
+    # Random words that almost never occur in the chunks (worst case: every scan runs to the end)
+    return [''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(5, 9)))
+            for _ in range(count)]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    rng = random.Random(7)
+
+    # The filter only needs the keyword matcher, so skip opening the index
+    store = VectorStore.__new__(VectorStore)
+    store.keywords = KeywordMatcher()
+
+    print(f"{'chunks':<12} {'legacy ms':>10} {'matcher ms':>11} {'speedup':>8}  same decisions")
+    for label, words in (('policy', POLICY_WORDS), ('boilerplate', BOILERPLATE_WORDS)):
+        texts = [make_chunk(rng, words) for _ in range(count)]
+        legacy = timed(legacy_is_relevant_content, texts)
+        matcher = timed(store._is_relevant_content, texts)
+        same = all(legacy_is_relevant_content(text) == store._is_relevant_content(text) for text in texts)
+        print(f"{label:<12} {legacy * 1000:10.1f} {matcher * 1000:11.1f} {legacy / matcher:7.1f}x  {same}")
+
+    print()
+    print(f"{'terms':<12} {'any() ms':>10} {'matcher ms':>11} {'speedup':>8}  (keyword lookup only)")
+    texts = [make_chunk(rng, BOILERPLATE_WORDS).lower() for _ in range(count // 5)]
+    for terms in (45, 200, 1000):
+        dictionary = make_terms(rng, terms)
+        keywords = KeywordMatcher({'terms': dictionary})
+        legacy = timed(lambda text: any(term in text for term in dictionary), texts)
+        matcher = timed(lambda text: keywords.contains_any(text, 'terms'), texts)
+        print(f"{terms:<12} {legacy * 1000:10.1f} {matcher * 1000:11.1f} {legacy / matcher:7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Micro-benchmark: top-k search kernel vs the previous cosine_similarity + argsort path
+
+Builds a synthetic L2-normalized TF-IDF matrix (Zipf-distributed terms, ~40
+terms per chunk) for each corpus size and times a query against both paths.
+
+Run from the repository root: python benchmarks/bench_search.py [sizes] [k]
+e.g. python benchmarks/bench_search.py 10000,100000,1000000 10
+"""
+import os
+import sys
+import time
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.preprocessing import normalize
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scoring import score_rows, top_k
+
+FEATURES = 200_000
+TERMS_PER_CHUNK = 40
+QUERY_TERMS = 6
+
+
+def make_matrix(rng: np.random.Generator, rows: int) -> csr_matrix:
+    indptr = np.arange(0, (rows + 1) * TERMS_PER_CHUNK, TERMS_PER_CHUNK, dtype=np.int64)
+    indices = (rng.zipf(1.3, rows * TERMS_PER_CHUNK) % FEATURES).astype(np.int32)
+    matrix = csr_matrix((rng.random(rows * TERMS_PER_CHUNK), indices, indptr), shape=(rows, FEATURES))
+    matrix.sum_duplicates()
+    return normalize(matrix)
+
+
+def make_query(rng: np.random.Generator) -> csr_matrix:
+    # Query terms drawn from the frequent end of the vocabulary, like real questions
+    columns = rng.choice(200, size=QUERY_TERMS, replace=False)
+    query = csr_matrix((rng.random(QUERY_TERMS), (np.zeros(QUERY_TERMS, dtype=np.int64), columns)),
+                       shape=(1, FEATURES))
+    return normalize(query)
+
+
+def legacy_search(matrix: csr_matrix, query: csr_matrix, k: int) -> np.ndarray:
+    similarities = cosine_similarity(query, matrix)[0]
+    top_indices = similarities.argsort()[-k:][::-1]
+    return top_indices[similarities[top_indices] > 0.01]
+
+
+def kernel_search(matrix: csr_matrix, query: csr_matrix, k: int) -> np.ndarray:
+    return top_k(score_rows(matrix, query), k, min_score=0.01)[0]
+
+
+def timed(fn, repeats: int) -> float:
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats
+
+
+def main():
+    sizes = [int(size) for size in (sys.argv[1] if len(sys.argv) > 1 else '10000,100000,1000000').split(',')]
+    k = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    rng = np.random.default_rng(42)
+
+    print(f"{'chunks':>9} {'nnz':>11} {'legacy ms':>10} {'kernel ms':>10} {'speedup':>8}  same top-k")
+    for rows in sizes:
+        matrix = make_matrix(rng, rows)
+        queries = [make_query(rng) for _ in range(5)]
+        repeats = max(1, 200_000 // rows)
+
+        legacy = sum(timed(lambda: legacy_search(matrix, query, k), repeats) for query in queries) / len(queries)
+        kernel = sum(timed(lambda: kernel_search(matrix, query, k), repeats) for query in queries) / len(queries)
+        same = all(set(legacy_search(matrix, query, k).tolist()) == set(kernel_search(matrix, query, k).tolist())
+                   for query in queries)
+
+        print(f"{rows:9d} {matrix.nnz:11d} {legacy * 1000:10.2f} {kernel * 1000:10.2f} "
+              f"{legacy / kernel:7.1f}x  {same}")
+        del matrix
+
+
+if __name__ == '__main__':
+    main()
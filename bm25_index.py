@@ -0,0 +1,297 @@
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy.sparse import csc_matrix, csr_matrix, vstack
+
+from scoring import top_k
+
+logger = logging.getLogger(__name__)
+
+
+class BM25Index:
+    """
+    Okapi BM25 over an inverted index with block-max pruning
+
+    postings is a (documents x terms) CSC matrix of raw term frequencies, so
+    column t is term t's posting list: document ids in increasing order with
+    their frequencies. Each posting list is cut into blocks of block_size
+    postings, and each block stores the largest BM25 term-frequency factor in
+    it. A query only reads the posting lists of its own terms:
+
+    1. Each block gets an upper bound: its own block maximum plus the best
+       block maxima of the other terms' blocks that overlap its document
+       range (WAND-style upper bounds at block granularity).
+    2. Blocks are scored in decreasing bound order. Their documents are
+       scored exactly by probing the other posting lists with binary
+       search, and the k-th best score so far is the threshold.
+    3. Processing stops once the next bound is below the threshold, because
+       no unscored document can reach the top k. When the bounds are too
+       flat to prune, the lists are instead scanned once into a dense
+       accumulator.
+
+    Scores are divided by the query's maximum attainable score, so they lie
+    in [0, 1] like the cosine scores of the TF-IDF engine.
+    """
+
+    def __init__(self, postings: csc_matrix, doc_lengths: np.ndarray, k1: float = 1.2, b: float = 0.75,
+                 block_size: int = 128, block_offsets: np.ndarray = None, block_starts: np.ndarray = None,
+                 block_max: np.ndarray = None):
+        self.postings = postings
+        self.doc_lengths = doc_lengths
+        self.k1 = k1
+        self.b = b
+        self.block_size = block_size
+
+        self.n_docs = postings.shape[0]
+        self.avgdl = float(doc_lengths.mean()) if self.n_docs else 0.0
+        df = np.diff(postings.indptr)
+        self.idf = np.log(1 + (self.n_docs - df + 0.5) / (df + 0.5))
+
+        if block_max is None:
+            block_offsets, block_starts, block_max = self._build_blocks()
+        self.block_offsets = block_offsets
+        self.block_starts = block_starts
+        self.block_max = block_max
+
+    @classmethod
+    def empty(cls, n_features: int = 0) -> 'BM25Index':
+        return cls.from_counts(csr_matrix((0, n_features), dtype=np.float32))
+
+    @classmethod
+    def from_counts(cls, counts: csr_matrix, **params) -> 'BM25Index':
+        """
+        Build from a (documents x terms) matrix of raw term counts
+        """
+        postings = csc_matrix(counts, dtype=np.float32)
+        postings.sort_indices()
+        doc_lengths = np.asarray(counts.sum(axis=1), dtype=np.float32).ravel()
+        return cls(postings, doc_lengths, **params)
+
+    def append(self, counts: csr_matrix) -> 'BM25Index':
+        """
+        A new index with counts' rows added as documents after the existing ones
+
+        The posting lists are merged in one sparse stack; block maxima are
+        recomputed because the average document length changes.
+        """
+        n_features = counts.shape[1]
+        # Terms first seen in counts get empty posting lists in the existing index
+        indptr = self.postings.indptr
+        indptr = np.concatenate([indptr, np.full(n_features + 1 - len(indptr), indptr[-1], dtype=indptr.dtype)])
+        existing = csc_matrix((self.postings.data, self.postings.indices, indptr),
+                              shape=(self.n_docs, n_features))
+        merged = csc_matrix(vstack([existing, csc_matrix(counts, dtype=np.float32)], format='csc'),
+                            dtype=np.float32)
+        merged.sort_indices()
+        doc_lengths = np.concatenate([self.doc_lengths,
+                                      np.asarray(counts.sum(axis=1), dtype=np.float32).ravel()])
+        return BM25Index(merged, doc_lengths, k1=self.k1, b=self.b, block_size=self.block_size)
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """
+        The index as flat arrays, for the on-disk format
+        """
+        return {
+            'bm25_postings_offsets': self.postings.indptr,
+            'bm25_postings_docs': self.postings.indices,
+            'bm25_postings_tfs': self.postings.data,
+            'bm25_doc_lengths': self.doc_lengths,
+            'bm25_block_offsets': self.block_offsets,
+            'bm25_block_starts': self.block_starts,
+            'bm25_block_max': self.block_max
+        }
+
+    def params(self) -> Dict:
+        return {'k1': self.k1, 'b': self.b, 'block_size': self.block_size}
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], n_features: int, params: Dict) -> 'BM25Index':
+        """
+        Rebuild from arrays(); they may be read-only memory maps
+        """
+        doc_lengths = arrays['bm25_doc_lengths']
+        postings = csc_matrix((arrays['bm25_postings_tfs'], arrays['bm25_postings_docs'],
+                               arrays['bm25_postings_offsets']),
+                              shape=(len(doc_lengths), n_features), copy=False)
+        return cls(postings, doc_lengths, block_offsets=arrays['bm25_block_offsets'],
+                   block_starts=arrays['bm25_block_starts'], block_max=arrays['bm25_block_max'], **params)
+
+    def search(self, term_ids: List[int], k: int, min_score: float = 0.0,
+               rows: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Row indices and normalized BM25 scores of the k best documents, best first
+
+        rows (sorted row indices) restricts the search to those documents.
+        """
+        indptr = self.postings.indptr
+        term_ids = [term for term in sorted(set(term_ids))
+                    if term < len(self.idf) and indptr[term + 1] > indptr[term]]
+        if not term_ids or k <= 0 or (rows is not None and not len(rows)):
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64)
+
+        terms = [self._term_blocks(term) for term in term_ids]
+        max_score = sum(term['idf'] for term in terms) * (self.k1 + 1)
+
+        if rows is not None:
+            # Probing the subset costs a binary search per (row, term); when the
+            # subset is large next to the postings, one pass over them is cheaper
+            total_postings = sum(len(term['docs']) for term in terms)
+            if len(rows) * len(terms) < total_postings:
+                scores = self._score(terms, rows) / max_score
+            else:
+                scores = self._score_all(terms)[rows] / max_score
+            positions, top_scores = top_k(scores, k, min_score=min_score)
+            return rows[positions], top_scores
+
+        # Upper bound of any document in each block: its own block-max plus the
+        # best block-max of every other term's blocks overlapping its doc range
+        bounds = []
+        for i, term in enumerate(terms):
+            bound = term['upper'].copy()
+            for j, other in enumerate(terms):
+                if j != i:
+                    bound += self._overlap_max(term['first_docs'], term['last_docs'], other)
+            bounds.append(bound)
+        bounds = np.concatenate(bounds)
+        block_terms = np.concatenate([np.full(len(term['upper']), i) for i, term in enumerate(terms)])
+        block_ranks = np.concatenate([np.arange(len(term['upper'])) for term in terms])
+        block_sizes = np.concatenate([term['ends'] - term['starts'] for term in terms])
+        order = np.argsort(-bounds, kind='stable')
+        total_postings = int(block_sizes.sum())
+
+        # Score blocks in decreasing bound order, in batches of doubling size, until
+        # the next bound falls below the current k-th best score: no document left
+        # unscored can then reach the top k
+        seen = np.zeros(self.n_docs, dtype=bool)
+        scored_docs, scored_scores = [], []
+        threshold, position, batch, read_postings = -1.0, 0, 1, 0
+        while position < len(order) and bounds[order[position]] >= threshold:
+            blocks = order[position:position + batch]
+            blocks = blocks[bounds[blocks] >= threshold]
+            read_postings += int(block_sizes[blocks].sum())
+            if read_postings * 8 > total_postings:
+                # Bounds are too flat to prune: one pass over the postings into a
+                # dense accumulator is cheaper than probing
+                scores = self._score_all(terms) / max_score
+                logger.debug(f"BM25 scored {total_postings} postings of {len(terms)} terms exhaustively")
+                # Select among matching documents only; argpartition is slow on long runs of zeros
+                matched = np.flatnonzero(scores)
+                positions, top_scores = top_k(scores[matched], k, min_score=min_score)
+                return matched[positions], top_scores
+
+            docs = np.concatenate([self._block_docs(terms[block_terms[block]], block_ranks[block:block + 1])
+                                   for block in blocks.tolist()])
+            docs = np.unique(docs[~seen[docs]])
+            seen[docs] = True
+            scored_docs.append(docs)
+            scored_scores.append(self._score(terms, docs))
+
+            all_scores = np.concatenate(scored_scores)
+            if len(all_scores) >= k:
+                threshold = np.partition(all_scores, -k)[-k]
+            position += batch
+            batch *= 2
+
+        candidates = np.concatenate(scored_docs)
+        scores = np.concatenate(scored_scores) / max_score
+        logger.debug(f"BM25 read {read_postings} of {total_postings} postings of {len(terms)} terms; "
+                     f"scored {len(candidates)} candidates")
+
+        positions, top_scores = top_k(scores, k, min_score=min_score)
+        return candidates[positions], top_scores
+
+    def _build_blocks(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Split every posting list into blocks and record each block's largest term-frequency factor
+        """
+        indptr = self.postings.indptr
+        lengths = np.diff(indptr)
+        blocks_per_term = -(-lengths // self.block_size)
+        block_offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(blocks_per_term, out=block_offsets[1:])
+
+        term_of_block = np.repeat(np.arange(len(lengths)), blocks_per_term)
+        rank_in_term = np.arange(block_offsets[-1]) - block_offsets[term_of_block]
+        block_starts = (indptr[term_of_block] + rank_in_term * self.block_size).astype(np.int64)
+
+        if not len(block_starts):
+            return block_offsets, block_starts, np.zeros(0, dtype=np.float32)
+
+        factors = self._tf_factor(self.postings.data, self.postings.indices)
+        block_max = np.maximum.reduceat(factors, block_starts).astype(np.float32)
+        return block_offsets, block_starts, block_max
+
+    def _tf_factor(self, tfs: np.ndarray, docs: np.ndarray) -> np.ndarray:
+        """
+        BM25 term-frequency factor with document-length normalization
+        """
+        norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[docs] / self.avgdl)
+        return tfs * (self.k1 + 1) / (tfs + norm)
+
+    def _term_blocks(self, term: int) -> Dict:
+        indptr = self.postings.indptr
+        start, end = indptr[term], indptr[term + 1]
+        lo, hi = self.block_offsets[term], self.block_offsets[term + 1]
+        docs = self.postings.indices[start:end]
+        starts = np.asarray(self.block_starts[lo:hi], dtype=np.int64) - start
+        ends = np.append(starts[1:], end - start)
+        idf = float(self.idf[term])
+        return {
+            'docs': docs,
+            'tfs': self.postings.data[start:end],
+            'idf': idf,
+            'starts': starts,
+            'ends': ends,
+            'first_docs': docs[starts],
+            'last_docs': docs[ends - 1],
+            'upper': idf * np.asarray(self.block_max[lo:hi], dtype=np.float64)
+        }
+
+    @staticmethod
+    def _block_docs(term: Dict, blocks: np.ndarray) -> np.ndarray:
+        """
+        Document ids of the given blocks of one posting list
+        """
+        starts, ends = term['starts'][blocks], term['ends'][blocks]
+        lengths = ends - starts
+        if not lengths.sum():
+            return np.zeros(0, dtype=term['docs'].dtype)
+        # Concatenated aranges: start_i, start_i + 1, ..., end_i - 1 for every block
+        offsets = np.repeat(starts - np.concatenate([[0], np.cumsum(lengths)[:-1]]), lengths)
+        return term['docs'][offsets + np.arange(lengths.sum())]
+
+    @staticmethod
+    def _overlap_max(first_docs: np.ndarray, last_docs: np.ndarray, other: Dict) -> np.ndarray:
+        """
+        For each block [first_docs[i], last_docs[i]], the best bound among other's overlapping blocks
+        """
+        lo = np.searchsorted(other['last_docs'], first_docs, side='left')
+        hi = np.searchsorted(other['first_docs'], last_docs, side='right')
+        # reduceat over (lo, hi) pairs; the appended 0 keeps hi == len(upper) a valid index
+        values = np.append(other['upper'], 0.0)
+        bounds = np.maximum.reduceat(values, np.stack([lo, hi], axis=1).ravel())[::2]
+        return np.where(hi > lo, bounds, 0.0)
+
+    def _score_all(self, terms: List[Dict]) -> np.ndarray:
+        """
+        BM25 scores of every document, accumulated term at a time over the postings
+        """
+        scores = np.zeros(self.n_docs, dtype=np.float64)
+        for term in terms:
+            # Document ids are unique within a posting list, so fancy += is safe
+            scores[term['docs']] += term['idf'] * self._tf_factor(term['tfs'], term['docs'])
+        return scores
+
+    def _score(self, terms: List[Dict], docs: np.ndarray) -> np.ndarray:
+        """
+        Exact BM25 scores of docs, probing each posting list by binary search
+        """
+        scores = np.zeros(len(docs), dtype=np.float64)
+        for term in terms:
+            positions = np.searchsorted(term['docs'], docs)
+            inside = positions < len(term['docs'])
+            hit = np.zeros(len(docs), dtype=bool)
+            hit[inside] = term['docs'][positions[inside]] == docs[inside]
+            scores[hit] += term['idf'] * self._tf_factor(term['tfs'][positions[hit]], docs[hit])
+        return scores
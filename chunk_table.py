@@ -0,0 +1,265 @@
+import numpy as np
+from collections.abc import Mapping
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+class ChunkTable:
+    """
+    Columnar (struct-of-arrays) storage for indexed chunks
+
+    Each chunk is one row across parallel arrays: interned source ids, page
+    numbers, per-page chunk ids and interned clause ids. All chunk texts live
+    in one contiguous UTF-8 buffer addressed by an offsets array, so a row
+    costs a few integers instead of a dict, a nested metadata dict and a
+    repeated filename string.
+    """
+
+    def __init__(self, sources: List[str], clauses: List[Tuple[str, str]],
+                 source_ids: np.ndarray, pages: np.ndarray, chunk_ids: np.ndarray,
+                 clause_ids: np.ndarray, text_offsets: np.ndarray, text_blob: np.ndarray,
+                 occurrence_offsets: np.ndarray, occurrence_source_ids: np.ndarray,
+                 occurrence_pages: np.ndarray):
+        self.sources = sources
+        self.clauses = clauses
+        self.source_ids = source_ids
+        self.pages = pages
+        self.chunk_ids = chunk_ids
+        self.clause_ids = clause_ids
+        self.text_offsets = text_offsets
+        self.text_blob = text_blob
+        # Other places each row's text was found (near-duplicates collapsed at
+        # ingest), stored CSR-style: row i owns entries offsets[i]:offsets[i + 1]
+        self.occurrence_offsets = occurrence_offsets
+        self.occurrence_source_ids = occurrence_source_ids
+        self.occurrence_pages = occurrence_pages
+
+    @classmethod
+    def empty(cls) -> 'ChunkTable':
+        return ChunkTableBuilder().build()
+
+    def __len__(self) -> int:
+        return len(self.pages)
+
+    def text(self, row: int) -> str:
+        """
+        Decode one chunk's text from the shared buffer
+        """
+        start, end = self.text_offsets[row], self.text_offsets[row + 1]
+        return self.text_blob[start:end].tobytes().decode('utf-8')
+
+    def texts(self, start: int = 0) -> Iterator[str]:
+        """
+        Iterate over chunk texts in row order, from row start onwards
+        """
+        for row in range(start, len(self)):
+            yield self.text(row)
+
+    def metadata(self, row: int) -> Dict:
+        """
+        Materialize one row's metadata in the chunk dict format used by DocumentProcessor
+        """
+        clause_number, clause_title = self.clauses[self.clause_ids[row]]
+        return {
+            'source': self.sources[self.source_ids[row]],
+            'page': int(self.pages[row]),
+            'clause_title': clause_title,
+            'clause_number': clause_number,
+            'chunk_id': int(self.chunk_ids[row]),
+            'occurrences': self.occurrences(row)
+        }
+
+    def occurrences(self, row: int) -> List[Dict]:
+        """
+        Every (source, page) where this row's text appears, its own location first
+        """
+        locations = [{'source': self.sources[self.source_ids[row]], 'page': int(self.pages[row])}]
+        start, end = self.occurrence_offsets[row], self.occurrence_offsets[row + 1]
+        for source_id, page in zip(self.occurrence_source_ids[start:end].tolist(),
+                                   self.occurrence_pages[start:end].tolist()):
+            locations.append({'source': self.sources[source_id], 'page': page})
+        return locations
+
+    def view(self, row: int, similarity_score: Optional[float] = None) -> 'ChunkView':
+        return ChunkView(self, row, similarity_score)
+
+    def clause_rows(self, start: int = 0, rows: Optional[Dict[str, List[int]]] = None) -> Dict[str, List[int]]:
+        """
+        Row positions of every numbered clause, in row order
+
+        Pass the mapping computed for earlier rows together with start to
+        extend it with rows appended since, instead of rescanning the table.
+        """
+        rows = {number: list(positions) for number, positions in rows.items()} if rows else {}
+        for row, clause_id in enumerate(self.clause_ids[start:].tolist(), start):
+            number = self.clauses[clause_id][0]
+            if number:
+                rows.setdefault(number, []).append(row)
+        return rows
+
+    def nbytes(self) -> int:
+        """
+        Approximate resident size of the columns
+        """
+        return sum(column.nbytes for column in (self.source_ids, self.pages, self.chunk_ids,
+                                                 self.clause_ids, self.text_offsets, self.text_blob,
+                                                 self.occurrence_offsets, self.occurrence_source_ids,
+                                                 self.occurrence_pages))
+
+
+class ChunkTableBuilder:
+    """
+    Accumulates chunk dicts and builds an immutable ChunkTable
+
+    Given a base table, new rows are numbered after the base rows and
+    build() returns a new table holding both; the base is left untouched.
+    """
+
+    def __init__(self, base: Optional[ChunkTable] = None):
+        self._base = base
+        self._row_base = len(base) if base is not None else 0
+        self._sources: List[str] = list(base.sources) if base is not None else []
+        self._source_index: Dict[str, int] = {source: idx for idx, source in enumerate(self._sources)}
+        # Clause id 0 is reserved for "no clause"
+        self._clauses: List[Tuple[str, str]] = list(base.clauses) if base is not None else [('', '')]
+        self._clause_index: Dict[Tuple[str, str], int] = {clause: idx for idx, clause in enumerate(self._clauses)}
+        self._source_ids: List[int] = []
+        self._pages: List[int] = []
+        self._chunk_ids: List[int] = []
+        self._clause_ids: List[int] = []
+        self._text_offsets: List[int] = [0]
+        self._text_blob = bytearray()
+        self._occurrences: Dict[int, List[Tuple[int, int]]] = {}
+
+    def __len__(self) -> int:
+        """
+        Total rows, including the base table's
+        """
+        return self._row_base + len(self._pages)
+
+    @property
+    def new_rows(self) -> int:
+        return len(self._pages)
+
+    def append(self, chunk: Dict):
+        metadata = chunk.get('metadata', {})
+        self._source_ids.append(self._intern_source(metadata.get('source', '')))
+        self._pages.append(metadata.get('page', 0))
+        self._chunk_ids.append(metadata.get('chunk_id', 0))
+        self._clause_ids.append(self._intern_clause(metadata.get('clause_number', ''),
+                                                    metadata.get('clause_title', '')))
+        self._text_blob.extend(chunk['text'].encode('utf-8'))
+        self._text_offsets.append(len(self._text_blob))
+
+    def extend(self, chunks):
+        for chunk in chunks:
+            self.append(chunk)
+
+    def add_occurrence(self, row: int, chunk: Dict):
+        """
+        Record that chunk duplicates an already appended row, keeping only its location
+        """
+        metadata = chunk.get('metadata', {})
+        location = (self._intern_source(metadata.get('source', '')), metadata.get('page', 0))
+        # The same location seen again (a document uploaded twice) adds nothing
+        if location == self._location(row) or location in self._occurrences.get(row, ()):
+            return
+        self._occurrences.setdefault(row, []).append(location)
+
+    def build(self) -> ChunkTable:
+        """
+        Build the table: base rows (if any) followed by the appended rows
+        """
+        base_offsets = self._base.text_offsets if self._base is not None else np.zeros(1, dtype=np.int64)
+        total_rows = len(self)
+
+        # Occurrences of base rows and of new rows, merged back into row order
+        occurrence_rows = [row for row, locations in self._occurrences.items() for _ in locations]
+        occurrence_source_ids = [source_id for locations in self._occurrences.values() for source_id, _ in locations]
+        occurrence_pages = [page for locations in self._occurrences.values() for _, page in locations]
+        if self._base is not None:
+            base_rows = np.repeat(np.arange(self._row_base), np.diff(self._base.occurrence_offsets))
+            occurrence_rows = np.concatenate([base_rows, np.array(occurrence_rows, dtype=np.int64)])
+            occurrence_source_ids = np.concatenate([self._base.occurrence_source_ids,
+                                                    np.array(occurrence_source_ids, dtype=np.int32)])
+            occurrence_pages = np.concatenate([self._base.occurrence_pages, np.array(occurrence_pages, dtype=np.int32)])
+        occurrence_rows = np.asarray(occurrence_rows, dtype=np.int64)
+        order = np.argsort(occurrence_rows, kind='stable')
+        occurrence_offsets = np.zeros(total_rows + 1, dtype=np.int64)
+        np.cumsum(np.bincount(occurrence_rows, minlength=total_rows), out=occurrence_offsets[1:])
+
+        def column(name, values, dtype):
+            new = np.array(values, dtype=dtype)
+            return new if self._base is None else np.concatenate([getattr(self._base, name), new])
+
+        return ChunkTable(
+            sources=list(self._sources),
+            clauses=list(self._clauses),
+            source_ids=column('source_ids', self._source_ids, np.int32),
+            pages=column('pages', self._pages, np.int32),
+            chunk_ids=column('chunk_ids', self._chunk_ids, np.int32),
+            clause_ids=column('clause_ids', self._clause_ids, np.int32),
+            text_offsets=np.concatenate([
+                base_offsets, np.array(self._text_offsets[1:], dtype=np.int64) + base_offsets[-1]
+            ]),
+            text_blob=column('text_blob', np.frombuffer(bytes(self._text_blob), dtype=np.uint8), np.uint8),
+            occurrence_offsets=occurrence_offsets,
+            occurrence_source_ids=np.asarray(occurrence_source_ids, dtype=np.int32)[order],
+            occurrence_pages=np.asarray(occurrence_pages, dtype=np.int32)[order]
+        )
+
+    def _location(self, row: int) -> Tuple[int, int]:
+        if row < self._row_base:
+            return int(self._base.source_ids[row]), int(self._base.pages[row])
+        row -= self._row_base
+        return self._source_ids[row], self._pages[row]
+
+    def _intern_source(self, source: str) -> int:
+        source_id = self._source_index.get(source)
+        if source_id is None:
+            source_id = self._source_index[source] = len(self._sources)
+            self._sources.append(source)
+        return source_id
+
+    def _intern_clause(self, number: str, title: str) -> int:
+        key = (number, title)
+        clause_id = self._clause_index.get(key)
+        if clause_id is None:
+            clause_id = self._clause_index[key] = len(self._clauses)
+            self._clauses.append(key)
+        return clause_id
+
+
+class ChunkView(Mapping):
+    """
+    Read-only search hit over one ChunkTable row
+
+    Behaves like the chunk dicts the rest of the app expects ('text',
+    'metadata', 'similarity_score') but only decodes fields when accessed.
+    """
+
+    __slots__ = ('table', 'row', 'similarity_score')
+
+    _KEYS = ('text', 'metadata', 'similarity_score')
+
+    def __init__(self, table: ChunkTable, row: int, similarity_score: Optional[float] = None):
+        self.table = table
+        self.row = row
+        self.similarity_score = similarity_score
+
+    def __getitem__(self, key):
+        if key == 'text':
+            return self.table.text(self.row)
+        if key == 'metadata':
+            return self.table.metadata(self.row)
+        if key == 'similarity_score' and self.similarity_score is not None:
+            return self.similarity_score
+        raise KeyError(key)
+
+    def __iter__(self):
+        return (key for key in self._KEYS if key != 'similarity_score' or self.similarity_score is not None)
+
+    def __len__(self) -> int:
+        return len(self._KEYS) if self.similarity_score is not None else len(self._KEYS) - 1
+
+    def __repr__(self) -> str:
+        return f"ChunkView(row={self.row}, similarity_score={self.similarity_score})"
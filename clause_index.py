@@ -0,0 +1,84 @@
+import bisect
+import re
+from typing import Dict, List, Optional, Tuple
+
+# A heading line: optional "Clause/Section/Article", a dotted number (or "N." for
+# top-level clauses) and a capitalised title without sentence punctuation
+HEADING_LINE = re.compile(
+    r'^\s*(?:(?:Clause|Section|Article)\s+)?(?P<number>\d+(?:\.\d+)+|\d+(?=\.))\.?[):]?\s+'
+    r'(?P<title>[A-Z][^.!?]{1,100})$'
+)
+
+# Leading clause number of an outline entry title, e.g. "4.2.1 Pre-existing Diseases"
+OUTLINE_NUMBER = re.compile(
+    r'^\s*(?:(?:Clause|Section|Article)\s+)?(?P<number>\d+(?:\.\d+)*)\.?[):]?\s*(?P<title>.*)$',
+    re.IGNORECASE
+)
+
+# A clause cited in a question, e.g. "what does clause 4.2.1 say"
+CLAUSE_REFERENCE = re.compile(r'\b(?:clause|section|article)\s+(?P<number>\d+(?:\.\d+)*)', re.IGNORECASE)
+
+
+def detect_headings(text: str) -> List[Tuple[str, str, str]]:
+    """
+    Find heading lines in raw page text
+
+    Returns (line, number, title) for every line that looks like a numbered heading.
+    """
+    headings = []
+    for line in text.splitlines():
+        match = HEADING_LINE.match(line)
+        if match:
+            headings.append((line, match.group('number'), match.group('title').strip()))
+    return headings
+
+
+def parse_outline_title(title: str) -> Tuple[str, str]:
+    """
+    Split an outline entry title into (number, title); number is '' when unnumbered
+    """
+    match = OUTLINE_NUMBER.match(title)
+    if match and match.group('title').strip():
+        return match.group('number'), match.group('title').strip()
+    return '', title.strip()
+
+
+def find_clause_reference(query: str) -> Optional[str]:
+    """
+    Return the clause number a query explicitly cites, if any
+    """
+    match = CLAUSE_REFERENCE.search(query)
+    return match.group('number') if match else None
+
+
+class ClauseIndex:
+    """
+    Document-wide clause/section spans in reading order
+
+    Headings are added page by page as (offset, number, title), where offset
+    is the heading's position in the cleaned page text. A clause's span runs
+    from its heading to the next heading, across page boundaries, so any
+    (page, offset) position maps to its enclosing clause with one bisect.
+    """
+
+    def __init__(self):
+        self._keys: List[Tuple[int, int]] = []
+        self._clauses: List[Dict[str, object]] = []
+
+    def __len__(self) -> int:
+        return len(self._clauses)
+
+    def add_headings(self, page: int, headings: List[Tuple[int, str, str]]):
+        """
+        Append a page's headings; pages must be added in document order
+        """
+        for offset, number, title in sorted(headings, key=lambda heading: heading[0]):
+            self._keys.append((page, offset))
+            self._clauses.append({'number': number, 'title': title, 'page': page})
+
+    def enclosing(self, page: int, offset: int) -> Optional[Dict[str, object]]:
+        """
+        The clause whose span contains the given position, or None before the first heading
+        """
+        idx = bisect.bisect_right(self._keys, (page, offset)) - 1
+        return self._clauses[idx] if idx >= 0 else None
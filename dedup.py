@@ -0,0 +1,119 @@
+import zlib
+import numpy as np
+from typing import Dict, Iterable, List, Optional
+
+# Mersenne prime for the universal hash family (a * x + b) mod p. Shingle
+# hashes are reduced mod p first, so a * x < 2**62 and a * x + b fits uint64
+_PRIME = (1 << 31) - 1
+
+
+class MinHashDeduplicator:
+    """
+    Detects near-duplicate chunks with MinHash signatures and LSH banding
+
+    Each registered chunk is summarised by num_perm minimum hashes over its
+    word shingles. Signatures are split into bands; chunks sharing any band
+    become candidates, and a candidate counts as a duplicate when the share
+    of equal signature slots (an estimate of Jaccard similarity) reaches
+    threshold.
+    """
+
+    def __init__(self, num_perm: int = 64, bands: int = 16, threshold: float = 0.8,
+                 shingle_size: int = 5, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+
+        rng = np.random.RandomState(seed)
+        # a and b uniform in [1, p): the modulus wraps, so each slot is an
+        # independent permutation with its own minimum shingle
+        self._a = rng.randint(1, _PRIME, size=num_perm).astype(np.uint64)
+        self._b = rng.randint(1, _PRIME, size=num_perm).astype(np.uint64)
+        self.num_perm = num_perm
+        self.seed = seed
+        self.bands = bands
+        self.rows_per_band = num_perm // bands
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+
+        self._buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(bands)]
+        self._signatures: Dict[int, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def signature(self, text: str) -> np.ndarray:
+        """
+        MinHash signature of a text's word shingles
+        """
+        words = text.lower().split()
+        size = self.shingle_size
+        if len(words) <= size:
+            shingles = {' '.join(words)}
+        else:
+            shingles = {' '.join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+        hashes = np.fromiter((zlib.crc32(shingle.encode('utf-8')) % _PRIME for shingle in shingles),
+                             dtype=np.uint64, count=len(shingles))
+        return ((np.outer(hashes, self._a) + self._b) % np.uint64(_PRIME)).min(axis=0)
+
+    def params(self) -> Dict:
+        """
+        Settings that determine the signatures; stored ones are only reusable with the same
+        """
+        return {'num_perm': self.num_perm, 'shingle_size': self.shingle_size, 'seed': self.seed,
+                'prime': _PRIME}
+
+    def signatures(self, keys: Iterable[int]) -> np.ndarray:
+        """
+        The registered signatures of keys, one row each
+        """
+        rows = [self._signatures[key] for key in keys]
+        return np.array(rows, dtype=np.uint64).reshape(len(rows), self.num_perm)
+
+    def add_signatures(self, signatures: np.ndarray, start_key: int = 0):
+        """
+        Register precomputed signatures (e.g. stored with the index) under consecutive keys, without hashing
+        """
+        for offset, signature in enumerate(np.asarray(signatures, dtype=np.uint64)):
+            self._register(start_key + offset, signature, self._band_keys(signature))
+
+    def find_or_add(self, text: str, key: int) -> Optional[int]:
+        """
+        Return the key of a registered near-duplicate of text, or register text under key
+        """
+        signature = self.signature(text)
+        band_keys = self._band_keys(signature)
+
+        duplicate = self._find(signature, band_keys)
+        if duplicate is None:
+            self._register(key, signature, band_keys)
+        return duplicate
+
+    def find(self, signature: np.ndarray, below: Optional[int] = None) -> Optional[int]:
+        """
+        The key of a registered near-duplicate of a signature, without registering it
+
+        Keys from below upwards are ignored, so a reader can look up the rows
+        it knows about while a writer registers newer ones.
+        """
+        return self._find(signature, self._band_keys(signature), below)
+
+    def _find(self, signature: np.ndarray, band_keys: List[bytes], below: Optional[int] = None) -> Optional[int]:
+        checked = set()
+        for band, band_key in enumerate(band_keys):
+            for candidate in self._buckets[band].get(band_key, ()):
+                if candidate in checked or (below is not None and candidate >= below):
+                    continue
+                checked.add(candidate)
+                if np.mean(self._signatures[candidate] == signature) >= self.threshold:
+                    return candidate
+        return None
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[band * self.rows_per_band:(band + 1) * self.rows_per_band].tobytes()
+                for band in range(self.bands)]
+
+    def _register(self, key: int, signature: np.ndarray, band_keys: List[bytes]):
+        self._signatures[key] = signature
+        for band, band_key in enumerate(band_keys):
+            self._buckets[band].setdefault(band_key, []).append(key)
@@ -0,0 +1,186 @@
+import hashlib
+import logging
+import os
+import re
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from scoring import top_k
+
+if TYPE_CHECKING:
+    import faiss
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+
+class HashingEncoder:
+    """
+    Deterministic, dependency-free text encoder for tests and offline deployments
+
+    Words and their character trigrams are hashed into dim signed buckets.
+    Trigrams let inflections and spelling variants ("hospitalisation",
+    "hospitalization") land near each other. This is not semantic: a
+    paraphrase with no shared word stems does not match.
+    """
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        embeddings = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                digest = int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'little')
+                embeddings[row, digest % self.dim] += 1.0 if (digest >> 63) else -1.0
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        np.divide(embeddings, norms, out=embeddings, where=norms > 0)
+        return embeddings
+
+    @staticmethod
+    def _features(text: str) -> Iterable[str]:
+        for word in TOKEN_PATTERN.findall(text.lower()):
+            yield word
+            padded = f"#{word}#"
+            for i in range(len(padded) - 2):
+                yield padded[i:i + 3]
+
+
+class SentenceTransformerEncoder:
+    """
+    sentence-transformers model loaded from a local directory (no downloads at runtime)
+    """
+
+    def __init__(self, model_dir: str, batch_size: int = 32, device: str = 'cpu'):
+        if not os.path.isdir(model_dir):
+            raise ValueError(f"Encoder model directory not found: {model_dir}")
+
+        # Imported lazily: torch is heavy and only needed when this encoder is configured
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model_dir, device=device)
+        self.batch_size = batch_size
+        self.dim = self.model.get_sentence_embedding_dimension()
+        self.name = f"st-{os.path.basename(os.path.normpath(model_dir))}-{self.dim}"
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        embeddings = self.model.encode(texts, batch_size=self.batch_size, convert_to_numpy=True,
+                                       normalize_embeddings=True, show_progress_bar=False)
+        return np.ascontiguousarray(embeddings, dtype=np.float32)
+
+
+def make_encoder(spec: Optional[str]):
+    """
+    Encoder from a deployment setting: '' (none), 'hashing', 'hashing:<dim>' or a model directory
+    """
+    if not spec:
+        return None
+    if spec == 'hashing' or spec.startswith('hashing:'):
+        _, _, dim = spec.partition(':')
+        return HashingEncoder(int(dim) if dim else 256)
+    return SentenceTransformerEncoder(spec)
+
+
+class DenseIndex:
+    """
+    Embeddings of every chunk in a FAISS inner-product index
+
+    Embeddings are L2-normalized, so inner product is cosine similarity.
+    Small corpora use an exact flat index. Once the corpus reaches
+    hnsw_threshold rows, it switches to an HNSW graph. HNSW needs no
+    training step and takes incremental adds, unlike IVF.
+    """
+
+    def __init__(self, encoder, index: Optional['faiss.Index'] = None, hnsw_threshold: int = 50_000,
+                 encode_batch_size: int = 64, hnsw_m: int = 32, ef_search: int = 64):
+        # Imported lazily: only the dense and hybrid engines need FAISS (the 'dense' extra)
+        import faiss
+
+        self.encoder = encoder
+        self.hnsw_threshold = hnsw_threshold
+        self.encode_batch_size = encode_batch_size
+        self.hnsw_m = hnsw_m
+        self.ef_search = ef_search
+        self.index = index if index is not None else faiss.IndexFlatIP(encoder.dim)
+        if isinstance(self.index, faiss.IndexHNSWFlat):
+            self.index.hnsw.efSearch = ef_search
+
+    def __len__(self) -> int:
+        return self.index.ntotal
+
+    @property
+    def kind(self) -> str:
+        import faiss
+        return 'hnsw' if isinstance(self.index, faiss.IndexHNSWFlat) else 'flat'
+
+    def append(self, texts: Iterable[str]) -> 'DenseIndex':
+        """
+        A new index with texts encoded (in batches) and added after the existing rows
+        """
+        import faiss
+        index = faiss.clone_index(self.index)
+        batch = []
+        for text in texts:
+            batch.append(text)
+            if len(batch) >= self.encode_batch_size:
+                index.add(self.encoder.encode(batch))
+                batch = []
+        if batch:
+            index.add(self.encoder.encode(batch))
+
+        if isinstance(index, faiss.IndexFlat) and index.ntotal >= self.hnsw_threshold:
+            logger.info(f"Dense index reached {index.ntotal} rows, switching from flat to HNSW")
+            hnsw = faiss.IndexHNSWFlat(self.encoder.dim, self.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+            hnsw.add(index.reconstruct_n(0, index.ntotal))
+            index = hnsw
+
+        return DenseIndex(self.encoder, index, hnsw_threshold=self.hnsw_threshold,
+                          encode_batch_size=self.encode_batch_size, hnsw_m=self.hnsw_m, ef_search=self.ef_search)
+
+    def search(self, query: str, k: int, min_score: float = 0.0,
+               rows: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Row indices and cosine scores of the k nearest chunks, best first
+
+        rows (sorted row indices) restricts the search to those chunks. A
+        subset below hnsw_threshold is scored exactly from its own vectors,
+        like a flat index would; a larger one is searched in the HNSW graph
+        with the other rows masked out.
+        """
+        if not len(self) or k <= 0 or (rows is not None and not len(rows)):
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        query_vector = self.encoder.encode([query])
+        params = None
+        if rows is not None:
+            if self.kind == 'flat' or len(rows) < self.hnsw_threshold:
+                positions, scores = top_k(self.index.reconstruct_batch(rows) @ query_vector[0], k,
+                                          min_score=min_score)
+                return rows[positions], scores
+            import faiss
+            params = faiss.SearchParametersHNSW(sel=faiss.IDSelectorBatch(rows), efSearch=self.ef_search)
+            k = min(k, len(rows))
+
+        scores, indices = self.index.search(query_vector, min(k, len(self)), params=params)
+        scores, indices = scores[0], indices[0]
+        keep = (indices >= 0) & (scores > min_score)
+        return indices[keep].astype(np.int64), scores[keep]
+
+    def write(self, path: str):
+        import faiss
+        faiss.write_index(self.index, path)
+
+    def params(self) -> Dict:
+        return {'encoder': self.encoder.name, 'dim': self.encoder.dim, 'kind': self.kind, 'rows': len(self)}
+
+    @classmethod
+    def read(cls, path: str, encoder, **options) -> 'DenseIndex':
+        """
+        Open a persisted index memory-mapped and read-only; append() works on a copy
+        """
+        import faiss
+        index = faiss.read_index(path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+        return cls(encoder, index, **options)
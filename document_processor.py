@@ -1,41 +1,266 @@
 import fitz  # PyMuPDF
+import bisect
+import hashlib
+import itertools
 import logging
+import math
 import re
-from typing import List, Dict
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import FrozenSet, Iterator, List, Dict, Optional, Tuple, Union
+
+from clause_index import ClauseIndex, detect_headings, parse_outline_title
+from extraction_cache import ExtractionCache
 
 logger = logging.getLogger(__name__)
 
-class DocumentProcessor:
+# Bump whenever cleaning or chunking changes the extracted output, so cached
+# extractions from older code are never served
+EXTRACTION_VERSION = 6
+
+DIGITS = re.compile(r'\d+')
+
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+')
+
+# Clause patterns like "Clause 12.3.1:", "Section 5:", "4.2. Title", "Title - Clause 7", in priority order
+CLAUSE_PATTERNS = [
+    re.compile(r'(?:Clause|Section|Article)\s+(?P<number>\d+(?:\.\d+)*)\s*:?\s*(?P<title>[^\n.]+)', re.IGNORECASE),
+    re.compile(r'(?P<number>\d+(?:\.\d+)*)\.\s*(?P<title>[A-Z][^.]+)', re.IGNORECASE),
+    re.compile(r'(?P<title>[A-Z][^.]+)\s*-\s*Clause\s+(?P<number>\d+(?:\.\d+)*)', re.IGNORECASE)
+]
+
+# Cheap literal anchors every match of the corresponding pattern must contain.
+# The "Title - Clause N" pattern backtracks over every sentence, so it is only
+# run on spans where its anchor occurs.
+CLAUSE_ANCHORS = [
+    None,
+    None,
+    re.compile(r'-\s*Clause\s+\d', re.IGNORECASE)
+]
+
+
+class TextNormalizer:
+    """
+    Precompiled cleaning rules applied to every extracted page
+    """
+
     def __init__(self):
+        self.page_marker = re.compile(r'Page \d+ of \d+')
+        # Once whitespace is collapsed the text is a single line, so the old
+        # per-line "^\d+\s*$" rule can only fire on a page that is just a number
+        self.bare_page_number = re.compile(r'\d+\s*')
+        # Fix common OCR issues: typographic dashes and quotes
+        self.replacements = [
+            ('\u2014', '-'),
+            ('\u201c', '"'),
+            ('\u201d', '"'),
+            ('\u2018', "'"),
+            ('\u2019', "'")
+        ]
+
+    def normalize(self, text: str) -> str:
+        """
+        Collapse whitespace, drop page headers/footers and fix typography
+        """
+        leading_space = text[:1].isspace()
+
+        # Remove excessive whitespace; str.split() uses the same definition of whitespace as \s
+        text = ' '.join(text.split())
+
+        # Remove page headers/footers (common patterns)
+        if 'Page ' in text:
+            text = self.page_marker.sub('', text)
+        if not leading_space and self.bare_page_number.fullmatch(text):
+            return ''
+
+        # Every replaced character is non-ASCII, so plain ASCII pages skip them entirely
+        if not text.isascii():
+            for old, new in self.replacements:
+                text = text.replace(old, new)
+
+        return text.strip()
+
+
+def _line_key(line: str) -> str:
+    """
+    Hash of a header/footer candidate line, insensitive to case, spacing and page numbers
+    """
+    normalized = DIGITS.sub('#', ' '.join(line.lower().split()))
+    return hashlib.blake2b(normalized.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def _open_pdf(source: Union[str, bytes]):
+    """
+    Open a PDF from a file path or from its bytes held in memory
+    """
+    if isinstance(source, (bytes, bytearray)):
+        return fitz.open(stream=source, filetype='pdf')
+    return fitz.open(source)
+
+
+# Per-process state of extraction workers, set up once by _init_worker
+_worker_state = {}
+
+
+def _init_worker(source: Union[str, bytes], filename: str, chunk_size: int, chunk_overlap: int,
+                 outline: Dict[int, List[str]], boilerplate: FrozenSet[str]):
+    """
+    Worker initializer: open a private handle on the PDF, kept for the life of the worker
+    """
+    processor = DocumentProcessor(max_workers=1)
+    processor.chunk_size = chunk_size
+    processor.chunk_overlap = chunk_overlap
+
+    _worker_state.update(
+        processor=processor,
+        doc=_open_pdf(source),
+        filename=filename,
+        outline=outline,
+        boilerplate=boilerplate
+    )
+
+
+def _process_page_range(start: int, end: int) -> List[Tuple]:
+    """
+    Worker entry point: process pages [start, end) of the worker's document
+    """
+    return list(_worker_state['processor']._iter_page_results(
+        _worker_state['doc'], start, end, _worker_state['filename'],
+        _worker_state['outline'], _worker_state['boilerplate']
+    ))
+
+
+class DocumentProcessor:
+    def __init__(self, max_workers: int = 1, parallel_min_pages: int = 24,
+                 cache: Optional[ExtractionCache] = None):
         self.chunk_size = 1000
         self.chunk_overlap = 200
+
+        # Parallel extraction settings; files below parallel_min_pages are always
+        # processed serially because spawning workers costs more than it saves
+        self.max_workers = max(1, max_workers)
+        self.parallel_min_pages = parallel_min_pages
+        self.max_pages_per_task = 16
+
+        # Optional content-addressed cache of previous extractions
+        self.cache = cache
+
+        # Cleaning rules are compiled once and reused for every page
+        self.normalizer = TextNormalizer()
+
+        # Header/footer detection: lines near the top or bottom of a page that
+        # repeat on at least boilerplate_min_share of the sampled pages are dropped.
+        # The sample is read serially before extraction starts, so it stays small
+        self.boilerplate_edge_lines = 3
+        self.boilerplate_min_share = 0.5
+        self.boilerplate_sample_pages = 12
     
     def process_pdf(self, filepath: str, filename: str) -> List[Dict]:
         """
         Process a PDF file and extract text chunks with metadata
         """
+        return list(self.iter_chunks(filepath, filename))
+
+    def iter_chunks(self, filepath: str, filename: str) -> Iterator[Dict]:
+        """
+        Lazily extract text chunks with metadata, page by page, in document order
+        """
+        return self._iter_source_chunks(filepath, filename)
+
+    def process_pdf_bytes(self, data: bytes, filename: str) -> List[Dict]:
+        """
+        Process a PDF held in memory and extract text chunks with metadata
+        """
+        return list(self.iter_chunks_from_bytes(data, filename))
+
+    def iter_chunks_from_bytes(self, data: bytes, filename: str) -> Iterator[Dict]:
+        """
+        Lazily extract text chunks from a PDF held in memory, without touching disk
+        """
+        return self._iter_source_chunks(data, filename)
+
+    def _iter_source_chunks(self, source: Union[str, bytes], filename: str) -> Iterator[Dict]:
+        """
+        Serve chunks from the extraction cache when possible, extracting and caching otherwise
+        """
+        if self.cache is None:
+            yield from self._extract_chunks(source, filename)
+            return
+
+        if isinstance(source, (bytes, bytearray)):
+            content_hash = hashlib.sha256(source).hexdigest()
+        else:
+            content_hash = ExtractionCache.hash_file(source)
+        key = ExtractionCache.make_key(content_hash, self._cache_settings())
+
+        cached = self.cache.load(key)
+        if cached is not None:
+            logger.info(f"Extraction cache hit for {filename}, skipping PDF parsing")
+            for chunk in cached:
+                # The same bytes may have been uploaded under another name
+                chunk['metadata']['source'] = filename
+                yield chunk
+            return
+
+        writer = self.cache.writer(key)
+        try:
+            for chunk in self._extract_chunks(source, filename):
+                writer.write(chunk)
+                yield chunk
+        except BaseException:
+            # Failed or abandoned extractions must not leave a partial entry
+            writer.abort()
+            raise
+        writer.commit()
+
+    def _cache_settings(self) -> Dict:
+        """
+        Settings that change the extracted chunks and therefore belong in the cache key
+        """
+        return {
+            'chunk_size': self.chunk_size,
+            'chunk_overlap': self.chunk_overlap,
+            'version': EXTRACTION_VERSION
+        }
+
+    def _extract_chunks(self, source: Union[str, bytes], filename: str) -> Iterator[Dict]:
+        """
+        Parse the PDF with PyMuPDF and yield its chunks
+        """
         doc = None
         try:
-            doc = fitz.open(filepath)
-            chunks = []
+            doc = _open_pdf(source)
             page_count = len(doc)
-            
-            for page_num in range(page_count):
-                page = doc[page_num]
-                text = page.get_text()
-                
-                # Clean and normalize text
-                text = self._clean_text(text)
-                
-                if not text.strip():
-                    continue
-                
-                # Split text into chunks
-                page_chunks = self._create_chunks(text, page_num + 1, filename)
-                chunks.extend(page_chunks)
-            
-            logger.info(f"Processed {filename}: {len(chunks)} chunks from {page_count} pages")
-            return chunks
+            outline = self._outline_by_page(doc)
+            boilerplate = self._detect_boilerplate(doc, page_count)
+            chunk_count = 0
+
+            if self._use_parallel(page_count):
+                # Workers open their own handles, release ours before forking
+                doc.close()
+                doc = None
+                page_results = self._iter_parallel(source, filename, page_count, outline, boilerplate)
+            else:
+                page_results = self._iter_page_results(doc, 0, page_count, filename, outline, boilerplate)
+
+            # Clause spans cross page boundaries, so chunks are mapped to their
+            # enclosing clause here, in page order, after the pages are processed
+            clause_index = ClauseIndex()
+            for page_num, headings, page_chunks in page_results:
+                clause_index.add_headings(page_num, headings)
+                for offset, chunk in page_chunks:
+                    clause = clause_index.enclosing(page_num, offset)
+                    if clause is None:
+                        # Text before the first heading: label it with a heading it contains, if any
+                        clause = clause_index.enclosing(page_num, offset + len(chunk['text']) - 1)
+                    if clause is not None:
+                        chunk['metadata']['clause_number'] = clause['number']
+                        chunk['metadata']['clause_title'] = clause['title']
+                    chunk_count += 1
+                    yield chunk
+
+            logger.info(f"Processed {filename}: {chunk_count} chunks from {page_count} pages, "
+                        f"{len(clause_index)} clause headings ({'outline' if outline else 'detected'})")
             
         except Exception as e:
             logger.error(f"Error processing PDF {filename}: {str(e)}")
@@ -46,63 +271,196 @@ class DocumentProcessor:
                     doc.close()
                 except:
                     pass  # Ignore close errors
-    
+
+    def _outline_by_page(self, doc) -> Dict[int, List[str]]:
+        """
+        Group the PDF outline (bookmarks) titles by 1-based page number
+        """
+        outline = {}
+        try:
+            toc = doc.get_toc()
+        except Exception as e:
+            logger.warning(f"Could not read PDF outline: {str(e)}")
+            return outline
+
+        for _level, title, page in toc:
+            if page >= 1 and title.strip():
+                outline.setdefault(page, []).append(title)
+        return outline
+
+    def _detect_boilerplate(self, doc, page_count: int) -> FrozenSet[str]:
+        """
+        Find header/footer lines that repeat across a large share of pages
+
+        Hashes the first and last few lines of at most boilerplate_sample_pages
+        evenly spaced pages and returns the keys of lines seen on enough of them.
+        """
+        if page_count < 3:
+            return frozenset()
+
+        samples = min(page_count, self.boilerplate_sample_pages)
+        sampled = sorted({idx * page_count // samples for idx in range(samples)})
+        counts = {}
+        for page_index in sampled:
+            for key in {_line_key(line) for line in self._edge_lines(doc[page_index].get_text())}:
+                counts[key] = counts.get(key, 0) + 1
+
+        threshold = max(2, math.ceil(len(sampled) * self.boilerplate_min_share))
+        boilerplate = frozenset(key for key, count in counts.items() if count >= threshold)
+        if boilerplate:
+            logger.info(f"Detected {len(boilerplate)} repeated header/footer lines over {len(sampled)} sampled pages")
+        return boilerplate
+
+    def _edge_lines(self, text: str) -> List[str]:
+        """
+        The first and last non-empty lines of a page
+        """
+        lines = [line for line in text.splitlines() if line.strip()]
+        edge = self.boilerplate_edge_lines
+        if len(lines) <= 2 * edge:
+            return lines
+        return lines[:edge] + lines[-edge:]
+
+    def _strip_boilerplate(self, text: str, boilerplate: FrozenSet[str]) -> str:
+        """
+        Drop repeated header/footer lines from the top and bottom of a page
+        """
+        if not boilerplate:
+            return text
+
+        lines = text.splitlines()
+        non_empty = [idx for idx, line in enumerate(lines) if line.strip()]
+        edge = self.boilerplate_edge_lines
+        candidates = non_empty if len(non_empty) <= 2 * edge else non_empty[:edge] + non_empty[-edge:]
+
+        dropped = {idx for idx in candidates if _line_key(lines[idx]) in boilerplate}
+        if not dropped:
+            return text
+        return '\n'.join(line for idx, line in enumerate(lines) if idx not in dropped)
+
+    def _use_parallel(self, page_count: int) -> bool:
+        """
+        Decide whether a document is large enough to be worth a process pool
+        """
+        return self.max_workers > 1 and page_count >= self.parallel_min_pages
+
+    def _page_ranges(self, page_count: int) -> List[Tuple[int, int]]:
+        """
+        Split [0, page_count) into contiguous ranges, a few per worker for load balancing
+        """
+        pages_per_task = math.ceil(page_count / (self.max_workers * 2))
+        pages_per_task = max(1, min(pages_per_task, self.max_pages_per_task))
+        return [(start, min(start + pages_per_task, page_count))
+                for start in range(0, page_count, pages_per_task)]
+
+    def _iter_parallel(self, source: Union[str, bytes], filename: str, page_count: int,
+                       outline: Dict[int, List[str]], boilerplate: FrozenSet[str]) -> Iterator[Tuple]:
+        """
+        Process page ranges in a pool of worker processes and yield them in page order
+        """
+        ranges = self._page_ranges(page_count)
+        workers = min(self.max_workers, len(ranges))
+        logger.info(f"Extracting {filename} with {workers} workers over {len(ranges)} page ranges")
+
+        # The source (a path or the PDF bytes) is shipped once per worker, not once per range
+        initargs = (source, filename, self.chunk_size, self.chunk_overlap, outline, boilerplate)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as executor:
+            # Keep a bounded window of ranges in flight so finished results
+            # never pile up faster than the consumer drains them
+            pending = deque()
+            remaining = iter(ranges)
+            for start, end in itertools.islice(remaining, workers * 2):
+                pending.append(executor.submit(_process_page_range, start, end))
+
+            # Drain in submission order so the output matches the serial path
+            while pending:
+                page_results = pending.popleft().result()
+                for start, end in itertools.islice(remaining, 1):
+                    pending.append(executor.submit(_process_page_range, start, end))
+                yield from page_results
+
+    def _iter_page_results(self, doc, start: int, end: int, filename: str,
+                           outline: Dict[int, List[str]], boilerplate: FrozenSet[str]) -> Iterator[Tuple]:
+        """
+        Lazily extract, clean and chunk pages [start, end) of an open document
+
+        Yields (page_num, headings, [(offset, chunk), ...]) per non-empty page,
+        where headings are (offset, number, title) in the cleaned page text.
+        """
+        headings_seen = False
+        for page_num in range(start + 1, end + 1):
+            raw_text = self._strip_boilerplate(doc[page_num - 1].get_text(), boilerplate)
+
+            # Clean and normalize text
+            text = self._clean_text(raw_text)
+
+            if not text.strip():
+                continue
+
+            # Headings come from the outline when the PDF has one, otherwise from the page itself
+            if outline:
+                titles = [(title, *parse_outline_title(title)) for title in outline.get(page_num, [])]
+            else:
+                titles = detect_headings(raw_text)
+            headings = self._locate_headings(text, titles)
+
+            # A chunk reaching a heading seen in this range gets its clause from
+            # ClauseIndex, so only the chunks before the first one need scanning
+            if headings_seen:
+                scan_end = 0
+            elif headings:
+                scan_end = min(offset for offset, _, _ in headings)
+            else:
+                scan_end = None
+            headings_seen = headings_seen or bool(headings)
+
+            # Split text into chunks
+            spans = self._chunk_spans(text)
+            page_chunks = self._create_chunks(text, page_num, filename, spans, scan_end)
+            yield page_num, headings, [(span[0], chunk) for span, chunk in zip(spans, page_chunks)]
+
+    def _locate_headings(self, text: str, titles: List[Tuple[str, str, str]]) -> List[Tuple[int, str, str]]:
+        """
+        Find each (raw line, number, title) heading in the cleaned page text, in order
+        """
+        headings = []
+        cursor = 0
+        for line, number, title in titles:
+            offset = text.find(self._clean_text(line), cursor)
+            if offset < 0:
+                # Not found verbatim (e.g. outline text differs from the page); keep the order
+                offset = cursor
+            headings.append((offset, number, title))
+            cursor = offset
+        return headings
+
     def _clean_text(self, text: str) -> str:
         """
         Clean and normalize extracted text
         """
-        # Remove excessive whitespace
-        text = re.sub(r'\s+', ' ', text)
-        
-        # Remove page headers/footers (common patterns)
-        text = re.sub(r'Page \d+ of \d+', '', text)
-        text = re.sub(r'^\d+\s*$', '', text, flags=re.MULTILINE)
-        
-        # Fix common OCR issues
-        text = text.replace('—', '-')
-        text = text.replace('"', '"').replace('"', '"')
-        text = text.replace(''', "'").replace(''', "'")
-        
-        return text.strip()
+        return self.normalizer.normalize(text)
     
-    def _create_chunks(self, text: str, page_num: int, filename: str) -> List[Dict]:
+    def _create_chunks(self, text: str, page_num: int, filename: str,
+                       spans: Optional[List[Tuple[int, int]]] = None,
+                       scan_end: Optional[int] = None) -> List[Dict]:
         """
         Split text into overlapping chunks with metadata
+
+        Clause headings are scanned for in the chunks ending at or before
+        scan_end (every chunk when None); the others are left unlabelled.
         """
         chunks = []
-        
-        # Try to split by sentences first
-        sentences = re.split(r'(?<=[.!?])\s+', text)
-        
-        current_chunk = ""
-        
-        for sentence in sentences:
-            # If adding this sentence would exceed chunk size, save current chunk
-            if len(current_chunk) + len(sentence) > self.chunk_size and current_chunk:
-                # Identify clause information
-                clause_info = self._extract_clause_info(current_chunk)
-                
-                chunks.append({
-                    'text': current_chunk.strip(),
-                    'metadata': {
-                        'source': filename,
-                        'page': page_num,
-                        'clause_title': clause_info.get('title', ''),
-                        'clause_number': clause_info.get('number', ''),
-                        'chunk_id': len(chunks)
-                    }
-                })
-                
-                # Start new chunk with overlap
-                current_chunk = sentence + " "
-            else:
-                current_chunk += sentence + " "
-        
-        # Add the last chunk if it has content
-        if current_chunk.strip():
-            clause_info = self._extract_clause_info(current_chunk)
+        clauses = None
+
+        for start, end in spans if spans is not None else self._chunk_spans(text):
+            clause_info = {}
+            if scan_end is None or end <= scan_end:
+                if clauses is None:
+                    clauses = _ClauseScanner(text)
+                clause_info = clauses.clause_for_span(start, end)
+
             chunks.append({
-                'text': current_chunk.strip(),
+                'text': text[start:end],
                 'metadata': {
                     'source': filename,
                     'page': page_num,
@@ -111,31 +469,99 @@ class DocumentProcessor:
                     'chunk_id': len(chunks)
                 }
             })
-        
+
         return chunks
-    
-    def _extract_clause_info(self, text: str) -> Dict[str, str]:
+
+    def _chunk_spans(self, text: str) -> List[Tuple[int, int]]:
         """
-        Extract clause number and title from text
+        Compute (start, end) offsets of chunks cut at sentence boundaries
+
+        Chunks hold whole sentences up to chunk_size characters. Each chunk
+        after the first starts with the trailing sentences of its predecessor
+        that fit in chunk_overlap characters.
         """
-        clause_info = {'title': '', 'number': ''}
-        
-        # Look for clause patterns like "Clause 12.3.1:", "Section 5:", etc.
-        clause_patterns = [
-            r'(?:Clause|Section|Article)\s+(\d+(?:\.\d+)*)\s*:?\s*([^\n.]+)',
-            r'(\d+(?:\.\d+)*)\.\s*([A-Z][^.]+)',
-            r'([A-Z][^.]+)\s*-\s*Clause\s+(\d+(?:\.\d+)*)'
+        # Sentence offsets; cleaned text has single spaces between sentences
+        starts, ends = [0], []
+        for match in SENTENCE_BOUNDARY.finditer(text):
+            ends.append(match.start())
+            starts.append(match.end())
+        ends.append(len(text))
+
+        spans = []
+        count = len(starts)
+        first = 0
+        while first < count:
+            # Greedily take sentences while they fit; a single long sentence is its own chunk
+            last = first
+            while last + 1 < count and ends[last + 1] - starts[first] <= self.chunk_size:
+                last += 1
+            spans.append((starts[first], ends[last]))
+
+            if last + 1 >= count:
+                break
+
+            # Back up to the earliest sentence that keeps the overlap within
+            # chunk_overlap, always moving forward and leaving room for the next sentence
+            next_first = bisect.bisect_left(starts, ends[last] - self.chunk_overlap, first + 1, last + 1)
+            while next_first <= last and ends[last + 1] - starts[next_first] > self.chunk_size:
+                next_first += 1
+            first = next_first
+
+        return spans
+
+
+class _ClauseScanner:
+    """
+    Finds clause headings in one page for a sequence of chunk spans
+
+    Each span is searched as if it were a standalone chunk, but spans arrive
+    in increasing start order, so a match found for one span is reused by
+    the following spans that still contain it instead of searching again.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        # Per pattern: (start, end of the searched range, match or None)
+        self._last_search = [None] * len(CLAUSE_PATTERNS)
+        # Per pattern: sorted (start, end) offsets of its anchor, found in one pass over the page
+        self._anchors = [
+            [match.span() for match in anchor.finditer(text)] if anchor is not None else None
+            for anchor in CLAUSE_ANCHORS
         ]
-        
-        for pattern in clause_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                if 'Clause' in pattern or 'Section' in pattern:
-                    clause_info['number'] = match.group(1)
-                    clause_info['title'] = match.group(2).strip()
-                else:
-                    clause_info['number'] = match.group(1)
-                    clause_info['title'] = match.group(2).strip()
+
+    def clause_for_span(self, start: int, end: int) -> Dict[str, str]:
+        """
+        Pick the first match of the highest-priority pattern inside [start, end)
+        """
+        clause_info = {'title': '', 'number': ''}
+
+        for idx, pattern in enumerate(CLAUSE_PATTERNS):
+            match = self._search(idx, pattern, start, end)
+            if match is not None:
+                clause_info['number'] = match.group('number')
+                clause_info['title'] = match.group('title').strip()
                 break
-        
+
         return clause_info
+
+    def _search(self, idx: int, pattern: re.Pattern, start: int, end: int):
+        anchors = self._anchors[idx]
+        if anchors is not None:
+            pos = bisect.bisect_left(anchors, (start, start))
+            if pos == len(anchors) or anchors[pos][1] > end:
+                return None
+
+        cached = self._last_search[idx]
+        if cached is not None:
+            searched_from, searched_to, match = cached
+            # Reusable if it is still the leftmost match and was not cut short by the old range end
+            if (match is not None and searched_from <= start <= match.start()
+                    and match.end() < searched_to <= end):
+                return match
+            # No match in a range covering this one means no match here either
+            if match is None and searched_from <= start and end <= searched_to:
+                return None
+
+        match = pattern.search(self.text, start, end)
+        self._last_search[idx] = (start, end, match)
+        return match
@@ -0,0 +1,162 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from typing import Dict, Iterator, Optional, TextIO
+
+logger = logging.getLogger(__name__)
+
+
+class ExtractionCache:
+    """
+    On-disk cache of extracted chunk lists, keyed by the SHA-256 of the PDF
+    bytes plus the chunker settings. Entries are JSON-lines files evicted in
+    least-recently-used order once the directory grows past max_bytes.
+    """
+
+    def __init__(self, cache_dir: str = 'extraction_cache', max_bytes: int = 256 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def hash_file(filepath: str) -> str:
+        """
+        SHA-256 of a file's bytes, read in blocks
+        """
+        digest = hashlib.sha256()
+        with open(filepath, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    @staticmethod
+    def make_key(content_hash: str, settings: Dict) -> str:
+        """
+        Combine the content hash with the extraction settings into a cache key
+        """
+        settings_blob = json.dumps(settings, sort_keys=True)
+        return hashlib.sha256(f"{content_hash}:{settings_blob}".encode('utf-8')).hexdigest()
+
+    def load(self, key: str) -> Optional[Iterator[Dict]]:
+        """
+        Return a lazy iterator over the cached chunks, or None on a miss
+        """
+        path = self._entry_path(key)
+        try:
+            # Open before returning: an entry evicted while it is being read
+            # stays readable through the handle
+            f = open(path, 'r', encoding='utf-8')
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        try:
+            # Touch the entry so eviction treats it as recently used
+            os.utime(path, None)
+        except FileNotFoundError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return self._read_entry(f)
+
+    def writer(self, key: str) -> '_CacheWriter':
+        """
+        Open a writer that publishes the entry only if it is committed
+        """
+        return _CacheWriter(self, key)
+
+    def stats(self) -> Dict:
+        """
+        Counters and size of the cache, for the metrics endpoint
+        """
+        entries, total_bytes = 0, 0
+        for entry in self._scan_entries():
+            entries += 1
+            total_bytes += entry.stat().st_size
+
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': entries,
+            'bytes': total_bytes,
+            'max_bytes': self.max_bytes
+        }
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.jsonl")
+
+    def _read_entry(self, f: TextIO) -> Iterator[Dict]:
+        with f:
+            for line in f:
+                yield json.loads(line)
+
+    def _scan_entries(self):
+        try:
+            with os.scandir(self.cache_dir) as it:
+                return [entry for entry in it if entry.is_file() and entry.name.endswith('.jsonl')]
+        except FileNotFoundError:
+            return []
+
+    def _evict(self):
+        """
+        Drop least recently used entries until the cache fits in max_bytes
+        """
+        with self._lock:
+            entries = []
+            for entry in self._scan_entries():
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+            total_bytes = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total_bytes <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    self.evictions += 1
+                except FileNotFoundError:
+                    pass
+                total_bytes -= size
+
+
+class _CacheWriter:
+    """
+    Streams chunks to a temporary file and atomically renames it into place on commit
+    """
+
+    def __init__(self, cache: ExtractionCache, key: str):
+        self.cache = cache
+        self.key = key
+        fd, self.tmp_path = tempfile.mkstemp(dir=cache.cache_dir, suffix='.tmp')
+        self.file = os.fdopen(fd, 'w', encoding='utf-8')
+
+    def write(self, chunk: Dict):
+        self.file.write(json.dumps(chunk, ensure_ascii=False))
+        self.file.write('\n')
+
+    def commit(self):
+        self.file.close()
+        os.replace(self.tmp_path, self.cache._entry_path(self.key))
+        self.cache._evict()
+
+    def abort(self):
+        self.file.close()
+        try:
+            os.remove(self.tmp_path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,222 @@
+import numpy as np
+from scipy.sparse import csr_matrix
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import normalize
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class IncrementalTfidfVectorizer:
+    """
+    TF-IDF with a vocabulary and document frequencies that grow as documents are added
+
+    Tokenization matches TfidfVectorizer (same analyzer, smooth IDF, L2
+    rows). Each batch of documents is weighted with the IDF as it stands
+    after that batch, so adding documents never re-vectorizes earlier ones;
+    queries are always weighted with the current IDF. For a single batch the
+    rows are identical to TfidfVectorizer.fit_transform.
+    """
+
+    def __init__(self, stop_words: str = 'english', ngram_range=(1, 2)):
+        self.stop_words = stop_words
+        self.ngram_range = ngram_range
+        self._vocabulary: Optional[Dict[str, int]] = {}
+        self._terms: Optional[Tuple[np.ndarray, np.ndarray]] = None
+        self.df = np.zeros(0, dtype=np.int64)
+        self.n_docs = 0
+        self._idf: Optional[np.ndarray] = None
+        self._analyzer = self._build_analyzer()
+
+    @classmethod
+    def from_arrays(cls, term_blob: np.ndarray, term_offsets: np.ndarray, df: np.ndarray, n_docs: int,
+                    idf: Optional[np.ndarray] = None, stop_words: str = 'english',
+                    ngram_range=(1, 2)) -> 'IncrementalTfidfVectorizer':
+        """
+        Rebuild a vectorizer from its array form (see term_arrays)
+
+        The arrays may be read-only memory maps; the term -> column dict is
+        only decoded from them the first time the vocabulary is used.
+        """
+        vectorizer = cls(stop_words=stop_words, ngram_range=ngram_range)
+        vectorizer._vocabulary = None
+        vectorizer._terms = (term_blob, term_offsets)
+        vectorizer.df = df
+        vectorizer.n_docs = n_docs
+        vectorizer._idf = idf
+        return vectorizer
+
+    def copy(self) -> 'IncrementalTfidfVectorizer':
+        """
+        A vectorizer that can be grown without changing this one
+        """
+        vectorizer = IncrementalTfidfVectorizer(stop_words=self.stop_words, ngram_range=self.ngram_range)
+        vectorizer._vocabulary = dict(self.vocabulary)
+        vectorizer.df = self.df
+        vectorizer.n_docs = self.n_docs
+        vectorizer._idf = self._idf
+        return vectorizer
+
+    @property
+    def vocabulary(self) -> Dict[str, int]:
+        vocabulary = self._vocabulary
+        if vocabulary is None:
+            # _terms is kept (until the vocabulary grows) so concurrent readers
+            # racing on the first decode all find it
+            term_blob, term_offsets = self._terms
+            blob = term_blob.tobytes()
+            offsets = term_offsets.tolist()
+            vocabulary = {blob[offsets[idx]:offsets[idx + 1]].decode('utf-8'): idx
+                          for idx in range(len(offsets) - 1)}
+            self._vocabulary = vocabulary
+        return vocabulary
+
+    @property
+    def n_features(self) -> int:
+        return len(self.df)
+
+    def term_arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Terms in column order as one UTF-8 blob plus an offsets array
+        """
+        if self._terms is not None:
+            return self._terms
+        terms = [''] * len(self._vocabulary)
+        for term, idx in self._vocabulary.items():
+            terms[idx] = term
+        encoded = [term.encode('utf-8') for term in terms]
+        term_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(term) for term in encoded], out=term_offsets[1:])
+        return np.frombuffer(b''.join(encoded), dtype=np.uint8), term_offsets
+
+    def idf(self) -> np.ndarray:
+        """
+        Smooth IDF over the documents seen so far, as TfidfVectorizer computes it
+        """
+        if self._idf is None:
+            self._idf = np.log((1 + self.n_docs) / (1 + self.df)) + 1
+        return self._idf
+
+    def partial_fit_transform(self, texts: Iterable[str]) -> csr_matrix:
+        """
+        Add documents to the vocabulary and document frequencies and return their TF-IDF rows
+        """
+        return self.weight(self.partial_fit_counts(texts))
+
+    def partial_fit_counts(self, texts: Iterable[str], max_features: Optional[int] = None) -> csr_matrix:
+        """
+        Add documents to the vocabulary and document frequencies and return their raw term counts
+
+        Once the vocabulary holds max_features terms, new terms are ignored
+        like unknown query terms, which bounds the vocabulary, the df arrays
+        and the matrix width however many documents are added.
+        """
+        matrix = self._count(texts, grow=True, max_features=max_features)
+        self._terms = None
+
+        # Document frequency: each stored (row, term) entry is one document containing the term
+        n_features = matrix.shape[1]
+        self.df = np.concatenate([self.df, np.zeros(n_features - len(self.df), dtype=np.int64)])
+        self.df += np.bincount(matrix.indices, minlength=n_features)
+        self.n_docs += matrix.shape[0]
+        self._idf = None
+
+        return matrix
+
+    def prune_rare_bigrams(self, counts: csr_matrix, min_df: int) -> csr_matrix:
+        """
+        counts without the entries of bigrams seen in fewer than min_df documents so far
+
+        Most bigrams occur in a single chunk and add stored entries, but little
+        recall. They stay in the vocabulary and keep counting, so a bigram
+        that reaches min_df is kept in rows added from then on.
+        """
+        if min_df <= 1 or not counts.nnz:
+            return counts
+
+        term_blob, term_offsets = self.term_arrays()
+        # Bigrams are the terms containing a space
+        bigrams = np.zeros(self.n_features, dtype=bool)
+        bigrams[np.searchsorted(term_offsets, np.flatnonzero(term_blob == ord(' ')), side='right') - 1] = True
+        return self._drop_terms(counts, bigrams & (self.df < min_df))
+
+    def prune_common_terms(self, counts: csr_matrix, max_df: float) -> csr_matrix:
+        """
+        counts without the entries of terms found in more than max_df of the documents so far
+
+        TfidfVectorizer's max_df for a growing corpus: such terms carry little
+        weight but many entries. Like rare bigrams they keep counting, so a
+        term is judged again against the corpus as each batch is added.
+        """
+        if max_df >= 1.0 or not counts.nnz:
+            return counts
+        return self._drop_terms(counts, self.df > max_df * self.n_docs)
+
+    @staticmethod
+    def _drop_terms(counts: csr_matrix, dropped: np.ndarray) -> csr_matrix:
+        keep = ~dropped[counts.indices]
+        row_ids = np.repeat(np.arange(counts.shape[0]), np.diff(counts.indptr))
+        indptr = np.zeros(counts.shape[0] + 1, dtype=np.int64)
+        np.cumsum(np.bincount(row_ids[keep], minlength=counts.shape[0]), out=indptr[1:])
+        return csr_matrix((counts.data[keep], counts.indices[keep], indptr), shape=counts.shape)
+
+    def count(self, texts: Iterable[str]) -> csr_matrix:
+        """
+        Raw term counts of texts over the current vocabulary; unknown terms are ignored
+        """
+        return self._count(texts, grow=False)
+
+    def transform(self, texts: Iterable[str], max_df: float = 1.0) -> csr_matrix:
+        """
+        TF-IDF rows for texts (queries) over the current vocabulary; unknown terms are ignored
+
+        Terms above max_df (see prune_common_terms) are ignored too.
+        """
+        return self.weight(self.prune_common_terms(self.count(texts), max_df))
+
+    def analyze(self, text: str) -> List[str]:
+        """
+        Terms (unigrams and bigrams) of a text, as indexed
+        """
+        return self._analyzer(text)
+
+    def _build_analyzer(self):
+        return TfidfVectorizer(stop_words=self.stop_words, ngram_range=self.ngram_range).build_analyzer()
+
+    def _count(self, texts: Iterable[str], grow: bool, max_features: Optional[int] = None) -> csr_matrix:
+        vocabulary = self.vocabulary
+        if max_features is None:
+            max_features = float('inf')
+        indptr, indices, counts = [0], [], []
+
+        for text in texts:
+            term_counts = {}
+            for term in self._analyzer(text):
+                idx = vocabulary.get(term)
+                if idx is None:
+                    if not grow or len(vocabulary) >= max_features:
+                        continue
+                    idx = vocabulary[term] = len(vocabulary)
+                term_counts[idx] = term_counts.get(idx, 0) + 1
+            indices.extend(term_counts.keys())
+            counts.extend(term_counts.values())
+            indptr.append(len(indices))
+
+        return csr_matrix(
+            (np.array(counts, dtype=np.float64), np.array(indices, dtype=np.int32), np.array(indptr, dtype=np.int64)),
+            shape=(len(indptr) - 1, len(vocabulary))
+        )
+
+    def term_ids(self, text: str) -> List[int]:
+        """
+        Column ids of the known terms (unigrams and bigrams) of a text
+        """
+        vocabulary = self.vocabulary
+        return [vocabulary[term] for term in self._analyzer(text) if term in vocabulary]
+
+    def weight(self, counts: csr_matrix) -> csr_matrix:
+        """
+        L2-normalized TF-IDF rows for a matrix of raw term counts (left unchanged)
+        """
+        matrix = counts.copy()
+        matrix.data *= self.idf()[matrix.indices]
+        matrix.sort_indices()
+        return normalize(matrix, norm='l2', copy=False)
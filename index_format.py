@@ -0,0 +1,173 @@
+import json
+import logging
+import os
+import shutil
+import tempfile
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from bm25_index import BM25Index
+from chunk_table import ChunkTable
+from dense_index import DenseIndex
+from incremental_vectorizer import IncrementalTfidfVectorizer
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the files or their meaning change; older indexes are rejected
+INDEX_FORMAT_VERSION = 5
+
+MANIFEST_FILE = 'manifest.json'
+DENSE_INDEX_FILE = 'dense.faiss'
+
+# Every array of the index, stored as <name>.npy
+_VECTOR_ARRAYS = ('vectors_data', 'vectors_indices', 'vectors_indptr')
+# Only present when the TF-IDF weights are stored as 8-bit
+_VECTOR_SCALES = 'vectors_scales'
+# MinHash signature of every row, so the deduplicator is rebuilt without rehashing the texts
+_DEDUP_SIGNATURES = 'dedup_signatures'
+_VOCABULARY_ARRAYS = ('term_blob', 'term_offsets', 'df', 'idf')
+_TABLE_ARRAYS = ('source_ids', 'pages', 'chunk_ids', 'clause_ids', 'text_offsets', 'text_blob',
+                 'occurrence_offsets', 'occurrence_source_ids', 'occurrence_pages')
+# Only present when the index was built for the BM25 engine
+_BM25_ARRAYS = ('bm25_postings_offsets', 'bm25_postings_docs', 'bm25_postings_tfs', 'bm25_doc_lengths',
+                'bm25_block_offsets', 'bm25_block_starts', 'bm25_block_max')
+
+
+class IndexFormatError(Exception):
+    pass
+
+
+def write_index(directory: str, vectorizer: IncrementalTfidfVectorizer, vectors: csr_matrix,
+                table: ChunkTable, bm25: Optional[BM25Index] = None, dense: Optional[DenseIndex] = None,
+                vector_scales: Optional[np.ndarray] = None, dedup_signatures: Optional[np.ndarray] = None,
+                dedup_params: Optional[Dict] = None):
+    """
+    Write the index as raw .npy arrays plus a JSON manifest
+
+    The BM25 postings are only stored when given. The dense index, when
+    there is one, is stored as a FAISS index file.
+    TF-IDF weights are stored in the matrix's own dtype; vector_scales are
+    the per-row scales of 8-bit weights (see vector_quantization).
+    dedup_signatures are the rows' MinHash signatures, computed with
+    dedup_params.
+
+    Files are written into a temporary sibling directory which then replaces
+    directory, so readers never see a half-written index.
+    """
+    parent = os.path.dirname(os.path.abspath(directory))
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=parent, prefix='.index-')
+    try:
+        term_blob, term_offsets = vectorizer.term_arrays()
+        arrays = {
+            'vectors_data': vectors.data,
+            'vectors_indices': vectors.indices,
+            'vectors_indptr': vectors.indptr,
+            'term_blob': term_blob,
+            'term_offsets': term_offsets,
+            'df': vectorizer.df,
+            'idf': vectorizer.idf()
+        }
+        arrays.update({name: getattr(table, name) for name in _TABLE_ARRAYS})
+        if bm25 is not None:
+            arrays.update(bm25.arrays())
+        if vector_scales is not None:
+            arrays[_VECTOR_SCALES] = vector_scales
+        if dedup_signatures is not None:
+            arrays[_DEDUP_SIGNATURES] = dedup_signatures
+        for name, array in arrays.items():
+            np.save(os.path.join(tmp_dir, f"{name}.npy"), np.ascontiguousarray(array))
+        if dense is not None:
+            dense.write(os.path.join(tmp_dir, DENSE_INDEX_FILE))
+
+        manifest = {
+            'format_version': INDEX_FORMAT_VERSION,
+            'rows': len(table),
+            'features': vectorizer.n_features,
+            'vector_dtype': str(vectors.dtype),
+            'n_docs': vectorizer.n_docs,
+            'stop_words': vectorizer.stop_words,
+            'ngram_range': list(vectorizer.ngram_range),
+            'sources': table.sources,
+            'clauses': [list(clause) for clause in table.clauses],
+            'bm25': bm25.params() if bm25 is not None else None,
+            'dense': dense.params() if dense is not None else None,
+            'dedup': dedup_params if dedup_signatures is not None else None
+        }
+        with open(os.path.join(tmp_dir, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False)
+
+        if os.path.isdir(directory):
+            # Open memory maps of the old files stay valid after they are unlinked
+            old_dir = tempfile.mkdtemp(dir=parent, prefix='.index-old-')
+            os.rmdir(old_dir)
+            os.replace(directory, old_dir)
+            os.replace(tmp_dir, directory)
+            shutil.rmtree(old_dir, ignore_errors=True)
+        else:
+            os.replace(tmp_dir, directory)
+
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+
+def read_index(directory: str, encoder=None,
+               dedup_params: Optional[Dict] = None) -> Tuple[IncrementalTfidfVectorizer, csr_matrix,
+                                                             Optional[np.ndarray], ChunkTable, Optional[BM25Index],
+                                                             Optional[DenseIndex], Optional[np.ndarray]]:
+    """
+    Open an index written by write_index with every array memory-mapped read-only
+
+    Nothing is copied onto the heap: processes opening the same index share
+    its pages through the OS page cache. BM25 postings are None when the
+    index was written without them. The dense index is only opened when
+    it was built with the given encoder; otherwise None is returned for it.
+    The row scales are None unless the TF-IDF weights are 8-bit. Likewise,
+    the MinHash signatures are only returned when computed with dedup_params.
+    """
+    manifest_path = os.path.join(directory, MANIFEST_FILE)
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    if manifest.get('format_version') != INDEX_FORMAT_VERSION:
+        raise IndexFormatError(f"Index format {manifest.get('format_version')} is not supported "
+                               f"(expected {INDEX_FORMAT_VERSION})")
+
+    arrays = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode='r')
+              for name in _VECTOR_ARRAYS + _VOCABULARY_ARRAYS + _TABLE_ARRAYS}
+
+    vectorizer = IncrementalTfidfVectorizer.from_arrays(
+        arrays['term_blob'], arrays['term_offsets'], arrays['df'], manifest['n_docs'], idf=arrays['idf'],
+        stop_words=manifest['stop_words'], ngram_range=tuple(manifest['ngram_range'])
+    )
+    vectors = csr_matrix((arrays['vectors_data'], arrays['vectors_indices'], arrays['vectors_indptr']),
+                         shape=(manifest['rows'], manifest['features']), copy=False)
+    vector_scales = None
+    if os.path.exists(os.path.join(directory, f"{_VECTOR_SCALES}.npy")):
+        vector_scales = np.load(os.path.join(directory, f"{_VECTOR_SCALES}.npy"), mmap_mode='r')
+    table = ChunkTable(
+        sources=manifest['sources'],
+        clauses=[tuple(clause) for clause in manifest['clauses']],
+        **{name: arrays[name] for name in _TABLE_ARRAYS}
+    )
+
+    bm25 = None
+    if manifest['bm25'] is not None:
+        bm25_arrays = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode='r') for name in _BM25_ARRAYS}
+        bm25 = BM25Index.from_arrays(bm25_arrays, manifest['features'], manifest['bm25'])
+
+    dense = None
+    dense_params = manifest.get('dense')
+    if encoder is not None and dense_params and dense_params['encoder'] == encoder.name:
+        dense = DenseIndex.read(os.path.join(directory, DENSE_INDEX_FILE), encoder)
+
+    dedup_signatures = None
+    if dedup_params is not None and manifest.get('dedup') == dedup_params:
+        dedup_signatures = np.load(os.path.join(directory, f"{_DEDUP_SIGNATURES}.npy"), mmap_mode='r')
+
+    logger.info(f"Opened index format v{INDEX_FORMAT_VERSION} with {manifest['rows']} rows "
+                f"and {manifest['features']} features ({manifest['vector_dtype']} weights)")
+    return vectorizer, vectors, vector_scales, table, bm25, dense, dedup_signatures
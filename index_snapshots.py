@@ -0,0 +1,122 @@
+import fcntl
+import json
+import logging
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from typing import Optional, Tuple
+
+from index_format import write_index
+
+logger = logging.getLogger(__name__)
+
+CURRENT_FILE = 'CURRENT'
+
+
+class SnapshotStore:
+    """
+    Immutable, numbered index snapshots shared by every worker process
+
+    Each publish writes a complete index into snapshots/<generation>/ (built
+    in a temporary directory and renamed into place) and then atomically
+    replaces the CURRENT manifest that names it. Readers only ever follow
+    CURRENT, so they see either the previous generation or the new one,
+    never a partial write. Detecting a new generation costs one stat() of
+    CURRENT. Writers serialize on an flock so generations are sequential
+    across processes.
+    """
+
+    def __init__(self, root: str, keep_generations: int = 2):
+        self.root = root
+        self.snapshots_dir = os.path.join(root, 'snapshots')
+        self.current_file = os.path.join(root, CURRENT_FILE)
+        self.lock_file = os.path.join(root, '.lock')
+        self.keep_generations = keep_generations
+
+        os.makedirs(self.snapshots_dir, exist_ok=True)
+
+    def current(self) -> Tuple[int, Optional[str]]:
+        """
+        (generation, snapshot directory) named by CURRENT; directory is None for an empty index
+        """
+        try:
+            with open(self.current_file, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return 0, None
+
+        snapshot = manifest.get('snapshot')
+        return manifest['generation'], os.path.join(self.snapshots_dir, snapshot) if snapshot else None
+
+    def signature(self) -> Optional[Tuple[int, int]]:
+        """
+        Cheap change marker for CURRENT: every publish replaces the file, giving a new inode
+        """
+        try:
+            stat = os.stat(self.current_file)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    @contextmanager
+    def write_lock(self):
+        """
+        Exclusive lock held across read-modify-publish, shared by all processes on this root
+        """
+        with open(self.lock_file, 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def publish(self, vectorizer, vectors, table, bm25, dense=None, vector_scales=None, dedup_signatures=None,
+                dedup_params=None) -> int:
+        """
+        Write a new snapshot and make it current; call with write_lock held
+        """
+        generation = self.current()[0] + 1
+        snapshot = f"{generation:08d}"
+        write_index(os.path.join(self.snapshots_dir, snapshot), vectorizer, vectors, table, bm25, dense,
+                    vector_scales, dedup_signatures, dedup_params)
+        self._set_current(generation, snapshot)
+        self._collect_garbage(generation)
+        logger.info(f"Published index generation {generation} with {len(table)} rows")
+        return generation
+
+    def publish_empty(self) -> int:
+        """
+        Make an empty index current; call with write_lock held
+        """
+        generation = self.current()[0] + 1
+        self._set_current(generation, None)
+        self._collect_garbage(generation)
+        logger.info(f"Published empty index generation {generation}")
+        return generation
+
+    def _set_current(self, generation: int, snapshot: Optional[str]):
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix='.current-')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'generation': generation, 'snapshot': snapshot}, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.current_file)
+        except Exception:
+            try:
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+    def _collect_garbage(self, generation: int):
+        """
+        Delete snapshots older than the last keep_generations
+
+        Workers still reading an older generation keep working: their memory
+        maps pin the unlinked files until they swap to the current one.
+        """
+        for name in os.listdir(self.snapshots_dir):
+            if name.isdigit() and int(name) <= generation - self.keep_generations:
+                shutil.rmtree(os.path.join(self.snapshots_dir, name), ignore_errors=True)
@@ -0,0 +1,90 @@
+import logging
+from typing import Dict, List, Optional
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from bm25_index import BM25Index
+from chunk_table import ChunkTable
+from dense_index import DenseIndex
+from incremental_vectorizer import IncrementalTfidfVectorizer
+from index_format import read_index
+from search_filters import MetadataIndex
+
+logger = logging.getLogger(__name__)
+
+
+class IndexState:
+    """
+    One complete, immutable version of the searchable index
+
+    The vectorizer, TF-IDF matrix (with its row scales when 8-bit), BM25
+    postings (for the BM25 engine), dense index, chunk table, clause lookup
+    and metadata filter index of a state always belong together, as do the
+    rows' MinHash signatures when stored. Nothing in a state is modified
+    after it is built: writers build a new state and swap it in with a
+    single reference assignment, so a search that picked up a state keeps a
+    consistent view of it however long it runs.
+    """
+
+    __slots__ = ('generation', 'vectorizer', 'vectors', 'vector_scales', 'bm25', 'dense', 'table', 'clause_rows',
+                 'metadata', 'dedup_signatures')
+
+    def __init__(self, generation: int, vectorizer: IncrementalTfidfVectorizer, vectors: Optional[csr_matrix],
+                 bm25: Optional[BM25Index], dense: Optional[DenseIndex], table: ChunkTable,
+                 clause_rows: Dict[str, List[int]], vector_scales: Optional[np.ndarray] = None,
+                 dedup_signatures: Optional[np.ndarray] = None):
+        self.generation = generation
+        self.vectorizer = vectorizer
+        self.vectors = vectors
+        self.vector_scales = vector_scales
+        self.bm25 = bm25
+        self.dense = dense
+        self.table = table
+        self.clause_rows = clause_rows
+        self.metadata = MetadataIndex(table, clause_rows)
+        self.dedup_signatures = dedup_signatures
+
+    @classmethod
+    def empty(cls, generation: int, encoder=None, with_bm25: bool = False) -> 'IndexState':
+        return cls(generation, IncrementalTfidfVectorizer(stop_words='english', ngram_range=(1, 2)), None,
+                   BM25Index.empty() if with_bm25 else None, DenseIndex(encoder) if encoder is not None else None,
+                   ChunkTable.empty(), {})
+
+    @classmethod
+    def load(cls, generation: int, snapshot_dir: Optional[str], encoder=None,
+             clause_rows: Optional[Dict[str, List[int]]] = None,
+             dedup_params: Optional[Dict] = None, with_bm25: bool = False) -> 'IndexState':
+        """
+        State of a published snapshot, memory-mapped; None is the empty index
+
+        clause_rows can be passed when the caller already computed it for the
+        snapshot (it was just published from there). Stored MinHash signatures
+        are loaded when they were computed with dedup_params. BM25 postings
+        are only kept with_bm25, and built here when the snapshot has none.
+        """
+        if snapshot_dir is None:
+            return cls.empty(generation, encoder, with_bm25)
+
+        vectorizer, vectors, vector_scales, table, bm25, dense, dedup_signatures = read_index(
+            snapshot_dir, encoder, dedup_params)
+        if encoder is not None and dense is None:
+            # Snapshot built without this encoder (e.g. the setting changed): embed it here
+            logger.warning(f"Snapshot has no {encoder.name} embeddings, encoding {len(table)} chunks")
+            dense = DenseIndex(encoder).append(table.texts())
+        if not with_bm25:
+            bm25 = None
+        elif bm25 is None:
+            # Snapshot written by a worker on another engine: index its stored texts here
+            logger.warning(f"Snapshot has no BM25 postings, indexing {len(table)} chunks")
+            bm25 = BM25Index.from_counts(vectorizer.count(table.texts()))
+        if clause_rows is None:
+            clause_rows = table.clause_rows()
+        return cls(generation, vectorizer, vectors, bm25, dense, table, clause_rows, vector_scales, dedup_signatures)
+
+    @property
+    def is_fitted(self) -> bool:
+        return self.vectors is not None and self.vectors.shape[0] > 0
+
+    def __len__(self) -> int:
+        return len(self.table)
@@ -0,0 +1,150 @@
+import json
+import logging
+import re
+from typing import Dict, Iterable, Iterator, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Term dictionaries used by chunk filtering, query parsing and the off-topic
+# check. Deployments can replace or add dictionaries (see load_dictionaries).
+DEFAULT_DICTIONARIES: Dict[str, Tuple[str, ...]] = {
+    # Chunks containing any of these are kept at indexing time
+    'relevant_content': (
+        'clause', 'section', 'coverage', 'covered', 'excluded', 'waiting period',
+        'sum insured', 'premium', 'deductible', 'co-pay', 'treatment', 'surgery',
+        'hospitalization', 'medical', 'claim', 'benefit', 'condition', 'terms',
+        'policy', 'insured', 'eligible', 'reimbursement', 'expenses', 'limit',
+        'pre-existing', 'exclusion', 'inclusion', 'cashless', 'network hospital',
+        'procedure', 'operation', 'disease', 'illness', 'injury', 'emergency',
+        'ambulance', 'consultation', 'diagnostic', 'therapy', 'medicine',
+        'rupees', '₹', 'amount', 'cost', 'fee', 'charge', 'payable'
+    ),
+    # Chunks containing one of these are checked for numbered procedure lists
+    # ("12 knee replacement surgery"); the list pattern uses the same words
+    'procedure_words': ('surgery', 'procedure', 'treatment', 'removal', 'repair'),
+    # Structured query parsing: each matched term is added to the query
+    'medical_terms': ('surgery', 'operation', 'treatment', 'procedure', 'therapy'),
+    'body_parts': ('knee', 'hip', 'heart', 'eye', 'spine', 'shoulder', 'ankle'),
+    'locations': ('pune', 'mumbai', 'delhi', 'bangalore', 'chennai', 'hyderabad'),
+    # Questions containing any of these are treated as insurance questions
+    'insurance_terms': (
+        'coverage', 'covered', 'claim', 'policy', 'premium', 'deductible',
+        'benefit', 'treatment', 'disease', 'illness', 'condition', 'medical',
+        'hospital', 'doctor', 'surgery', 'medication', 'therapy', 'diagnosis',
+        'accident', 'injury', 'disability', 'travel', 'flight', 'cancellation',
+        'property', 'damage', 'loss', 'theft', 'fire', 'flood', 'earthquake',
+        'dental', 'vision', 'maternity', 'pregnancy', 'mental health',
+        'pre-existing', 'waiting period', 'exclusion', 'limit', 'sum insured',
+        'reimbursement', 'cashless', 'network hospital', 'co-pay'
+    ),
+    # Questions starting with one of these (and no insurance term) are off-topic
+    'non_insurance': (
+        'candy', 'chocolate', 'snack', 'toy', 'game', 'pencil', 'pen',
+        'homework', 'test score', 'weather', 'time', 'date', 'joke'
+    ),
+}
+
+
+def load_dictionaries(path: Optional[str] = None) -> Dict[str, Tuple[str, ...]]:
+    """
+    The default dictionaries, with those in a JSON file ({"name": ["term", ...]}) replacing or adding to them
+    """
+    dictionaries = dict(DEFAULT_DICTIONARIES)
+    if path:
+        with open(path, 'r', encoding='utf-8') as f:
+            overrides = json.load(f)
+        dictionaries.update({name: tuple(terms) for name, terms in overrides.items()})
+        logger.info(f"Loaded keyword dictionaries {sorted(overrides)} from {path}")
+    return dictionaries
+
+
+class KeywordMatcher:
+    """
+    Finds every dictionary term occurring in a text in one scan
+
+    All terms of all dictionaries are compiled into one trie-shaped
+    alternation (shared prefixes are tested once), and each search finds the
+    next position where a term starts and the longest term starting there.
+    The shorter terms also starting there are prefixes of that term and are
+    added from a precomputed prefix closure. Searching resumes one character
+    after each match start, so overlapping terms are found too: the result
+    is exactly the set of terms for which `term in text` holds.
+
+    Unlike a scan per term, the cost does not grow with the number of terms.
+
+    Terms are matched as given (lowercase by default); pass lowercased text.
+    """
+
+    def __init__(self, dictionaries: Optional[Dict[str, Iterable[str]]] = None):
+        dictionaries = dictionaries if dictionaries is not None else DEFAULT_DICTIONARIES
+        self.dictionaries: Dict[str, frozenset] = {name: frozenset(term for term in terms if term)
+                                                   for name, terms in dictionaries.items()}
+        terms = set().union(*self.dictionaries.values())
+
+        # Each term with the terms that are prefixes of it (itself included)
+        self._closure: Dict[str, frozenset] = {
+            term: frozenset(other for other in terms if term.startswith(other)) for term in terms
+        }
+        # Names of the dictionaries containing a term or one of its prefixes
+        self._closure_dictionaries: Dict[str, frozenset] = {
+            term: frozenset(name for name, members in self.dictionaries.items() if members & closure)
+            for term, closure in self._closure.items()
+        }
+        self._pattern = re.compile(self._trie_pattern(terms)) if terms else None
+
+    @classmethod
+    def _trie_pattern(cls, terms: Iterable[str]) -> str:
+        trie: Dict = {}
+        for term in terms:
+            node = trie
+            for char in term:
+                node = node.setdefault(char, {})
+            node[''] = {}
+        return cls._node_pattern(trie)
+
+    @classmethod
+    def _node_pattern(cls, node: Dict) -> str:
+        branches = [re.escape(char) + cls._node_pattern(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        # Greedy optional: a longer term is preferred over one ending here
+        return f"(?:{body})?" if '' in node else body
+
+    def iter_longest(self, text: str) -> Iterator[str]:
+        """
+        The longest term starting at each position of text where one does
+        """
+        if self._pattern is None:
+            return
+        search = self._pattern.search
+        match = search(text)
+        while match is not None:
+            yield match.group()
+            match = search(text, match.start() + 1)
+
+    def find(self, text: str) -> Dict[str, Set[str]]:
+        """
+        Terms of each dictionary occurring in text
+        """
+        found: Set[str] = set()
+        for term in set(self.iter_longest(text)):
+            found |= self._closure[term]
+        return {name: found & members for name, members in self.dictionaries.items()}
+
+    def matching_dictionaries(self, text: str, stop_at: Optional[str] = None) -> Set[str]:
+        """
+        Names of the dictionaries with a term in text; stops once stop_at is among them
+        """
+        names: Set[str] = set()
+        for term in self.iter_longest(text):
+            names |= self._closure_dictionaries[term]
+            if stop_at in names:
+                break
+        return names
+
+    def contains_any(self, text: str, dictionary: str) -> bool:
+        """
+        Whether any term of dictionary occurs in text; stops at the first one
+        """
+        return any(dictionary in self._closure_dictionaries[term] for term in self.iter_longest(text))
@@ -5,18 +5,25 @@ import logging
 from typing import List, Dict
 from dotenv import load_dotenv
 
+from keyword_matcher import KeywordMatcher
+
 # Load environment variables from .env file
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
 class LLMClient:
-    def __init__(self):
+    def __init__(self, context_docs: int = 3, keyword_matcher: KeywordMatcher = None):
         self.api_key = os.getenv('OPENROUTER_API_KEY')
         if not self.api_key:
             raise ValueError("OPENROUTER_API_KEY not found in environment variables")
         self.model = "deepseek/deepseek-r1-0528-qwen3-8b:free"
         self.base_url = "https://openrouter.ai/api/v1/chat/completions"
+        # Chunks sent to the model per query; better-ranked retrieval (hybrid)
+        # allows fewer, which means fewer prompt tokens
+        self.context_docs = context_docs
+        # Term dictionaries for telling insurance questions from off-topic ones
+        self.keywords = keyword_matcher if keyword_matcher is not None else KeywordMatcher()
 
     def generate_decision(self, query: str, relevant_docs: List[Dict]) -> Dict:
         """
@@ -84,33 +91,16 @@ class LLMClient:
         if len(query_lower) < 3:
             return True
 
-        # Insurance-related keywords that should NOT be filtered out
-        insurance_keywords = [
-            'coverage', 'covered', 'claim', 'policy', 'premium', 'deductible',
-            'benefit', 'treatment', 'disease', 'illness', 'condition', 'medical',
-            'hospital', 'doctor', 'surgery', 'medication', 'therapy', 'diagnosis',
-            'accident', 'injury', 'disability', 'travel', 'flight', 'cancellation',
-            'property', 'damage', 'loss', 'theft', 'fire', 'flood', 'earthquake',
-            'dental', 'vision', 'maternity', 'pregnancy', 'mental health',
-            'pre-existing', 'waiting period', 'exclusion', 'limit', 'sum insured',
-            'reimbursement', 'cashless', 'network hospital', 'co-pay'
-        ]
+        # Insurance-related keywords and obvious non-insurance items, found in one scan
+        found = self.keywords.find(query_lower)
 
         # If query contains insurance keywords, it's likely insurance-related
-        for keyword in insurance_keywords:
-            if keyword in query_lower:
-                return False
-
-        # Common non-insurance items (only very obvious ones)
-        obvious_non_insurance = [
-            'candy', 'chocolate', 'snack', 'toy', 'game', 'pencil', 'pen',
-            'homework', 'test score', 'weather', 'time', 'date', 'joke'
-        ]
+        if found['insurance_terms']:
+            return False
 
         # Only filter out if it's obviously not insurance-related
-        for item in obvious_non_insurance:
-            if query_lower.startswith(item) or query_lower == item:
-                return True
+        if any(query_lower.startswith(item) for item in found['non_insurance']):
+            return True
 
         # Default to treating as insurance-related to be more helpful
         return False
@@ -137,17 +127,22 @@ class LLMClient:
         """
         context_parts = []
 
-        for i, doc in enumerate(relevant_docs[:3]):  # Use top 3 docs for better context
+        for i, doc in enumerate(relevant_docs[:self.context_docs]):
             metadata = doc.get('metadata', {})
             text = doc.get('text', '')[:600]  # Slightly longer text for better context
             similarity = doc.get('similarity_score', 0)
 
+            # Passages repeated across files are indexed once; cite every place they appear
+            also_in = ', '.join(f"{occurrence['source']} p.{occurrence['page']}"
+                                for occurrence in metadata.get('occurrences', [])[1:])
+            also_in_line = f"\nAlso in: {also_in}" if also_in else ''
+
             # Structure each document section clearly
             context_part = f"""
 Document {i+1} (Relevance: {similarity:.2f}):
 File: {metadata.get('source', 'Unknown')}
 Page: {metadata.get('page', '?')}
-Clause: {metadata.get('clause_title', 'N/A')}
+Clause: {metadata.get('clause_title', 'N/A')}{also_in_line}
 Content: {text}
 ---"""
             context_parts.append(context_part)
@@ -282,6 +277,13 @@ Just respond like you're having a normal conversation - no templates, headers, o
                     'page': str(metadata.get('page', 'N/A')),
                     'relevance': 'Contains relevant policy information for this query'
                 })
+                # The same passage found in other uploaded files
+                for occurrence in metadata.get('occurrences', [])[1:]:
+                    sources.append({
+                        'document': occurrence['source'],
+                        'page': str(occurrence['page']),
+                        'relevance': 'Same policy text as above'
+                    })
 
             # Return the natural response directly
             return {
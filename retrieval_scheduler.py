@@ -0,0 +1,130 @@
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from search_filters import SearchFilters
+
+logger = logging.getLogger(__name__)
+
+
+class _PendingSearch:
+    __slots__ = ('query', 'k', 'filters', 'done', 'lead', 'results', 'error')
+
+    def __init__(self, query: str, k: int, filters: Optional[SearchFilters]):
+        self.query = query
+        self.k = k
+        self.filters = filters
+        self.done = threading.Event()
+        self.lead = False
+        self.results: List[Dict] = []
+        self.error: Optional[Exception] = None
+
+
+class RetrievalScheduler:
+    """
+    Micro-batches concurrent searches into single search_many calls
+
+    Callers queue their query and one of them, the leader, runs a batch
+    while the others wait for their results. When the leader is done it
+    hands leadership to the oldest query still queued. So under load,
+    everything that arrived during one batch is scored together in the
+    next. A query arriving on an idle server becomes leader and runs at
+    once.
+
+    max_wait_ms additionally lets a leader that finds other queries queued
+    wait (until max_batch are queued, at most that long) for more to
+    arrive. It only pays off when a batch costs much more to start than
+    to extend; with sparse scoring it is usually best left at 0.
+    """
+
+    def __init__(self, search_many: Callable[[List[str], int, Optional[SearchFilters]], List[List[Dict]]],
+                 max_batch: int = 16, max_wait_ms: float = 0.0):
+        self.search_many = search_many
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait_ms / 1000
+        self._queue: List[_PendingSearch] = []
+        self._leader_active = False
+        self._cond = threading.Condition()
+        self._batches = 0
+        self._queries = 0
+        self._largest_batch = 0
+
+    def search(self, query: str, k: int = 5, filters: Optional[SearchFilters] = None) -> List[Dict]:
+        """
+        Results of search_many([query], k, filters)[0], possibly computed in a batch with other callers
+        """
+        pending = _PendingSearch(query, k, filters)
+        with self._cond:
+            self._queue.append(pending)
+            pending.lead = not self._leader_active
+            self._leader_active = True
+            self._cond.notify()
+
+        if not pending.lead:
+            # Woken either with results or because this query was promoted to leader
+            pending.done.wait()
+        if pending.lead:
+            self._lead()
+
+        if pending.error is not None:
+            raise pending.error
+        return pending.results
+
+    def _lead(self):
+        with self._cond:
+            if self.max_wait > 0 and 1 < len(self._queue) < self.max_batch:
+                deadline = time.monotonic() + self.max_wait
+                while len(self._queue) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+            batch = self._queue[:self.max_batch]
+            del self._queue[:self.max_batch]
+
+        try:
+            self._run(batch)
+        finally:
+            with self._cond:
+                self._batches += 1
+                self._queries += len(batch)
+                self._largest_batch = max(self._largest_batch, len(batch))
+                if self._queue:
+                    successor = self._queue[0]
+                    successor.lead = True
+                    successor.done.set()
+                else:
+                    self._leader_active = False
+            for pending in batch:
+                pending.lead = False
+                pending.done.set()
+
+    def _run(self, batch: List[_PendingSearch]):
+        # Queries sharing k and filters are searched together
+        groups: Dict[Tuple[int, Optional[SearchFilters]], List[_PendingSearch]] = {}
+        for pending in batch:
+            groups.setdefault((pending.k, pending.filters), []).append(pending)
+
+        for (k, filters), group in groups.items():
+            try:
+                for pending, results in zip(group, self.search_many([pending.query for pending in group], k, filters)):
+                    pending.results = results
+            except Exception as e:
+                logger.error(f"Error running batch of {len(group)} searches: {str(e)}")
+                for pending in group:
+                    pending.error = e
+
+    def stats(self) -> Dict:
+        """
+        Batch counts and sizes, for the metrics endpoint
+        """
+        with self._cond:
+            return {
+                'batches': self._batches,
+                'queries': self._queries,
+                'mean_batch_size': self._queries / self._batches if self._batches else 0.0,
+                'max_batch_size': self._largest_batch,
+                'max_batch': self.max_batch,
+                'max_wait_ms': self.max_wait * 1000
+            }
@@ -0,0 +1,114 @@
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix, vstack
+
+from vector_quantization import float32_blocks
+
+
+def score_rows(matrix: csr_matrix, query_vector: csr_matrix, row_scales: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Cosine similarity of every row against one query row
+
+    Both sides are L2-normalized at index/query time, so the cosine is the
+    plain dot product: one CSR matrix-vector product with the query scattered
+    into a dense weight vector, with no renormalization and no copy of the
+    (possibly memory-mapped) matrix.
+
+    float32 rows are scored in float32 (a float64 query would make scipy
+    upcast the whole matrix); 8-bit rows block by block in float32, then
+    times row_scales (see vector_quantization).
+    """
+    weights = np.zeros(matrix.shape[1], dtype=_score_dtype(matrix))
+    weights[query_vector.indices] = query_vector.data
+    if matrix.dtype != np.uint8:
+        return matrix @ weights
+
+    scores = np.concatenate([np.zeros(0, dtype=np.float32)] + [block @ weights for block in float32_blocks(matrix)])
+    return scores * row_scales if row_scales is not None else scores
+
+
+def score_rows_many(matrix: csr_matrix, query_vectors: csr_matrix,
+                    row_scales: Optional[np.ndarray] = None) -> Iterator[np.ndarray]:
+    """
+    score_rows for several query rows at once, yielding one score array per query
+
+    All queries are scored by a single sparse matrix-matrix product. For each
+    (row, query) pair it adds the same non-zero products in the same order as
+    the matrix-vector product, so the scores are bitwise identical to
+    score_rows and select the same top k.
+    """
+    dtype = _score_dtype(matrix)
+    query_vectors = query_vectors.astype(dtype, copy=query_vectors.dtype != dtype).T
+    if matrix.dtype != np.uint8:
+        products = (matrix @ query_vectors).tocsc()
+    else:
+        products = vstack([block @ query_vectors for block in float32_blocks(matrix)], format='csc')
+    for column in range(products.shape[1]):
+        start, end = products.indptr[column], products.indptr[column + 1]
+        scores = np.zeros(matrix.shape[0], dtype=dtype)
+        scores[products.indices[start:end]] = products.data[start:end]
+        yield scores * row_scales if row_scales is not None else scores
+
+
+def _score_dtype(matrix: csr_matrix):
+    return np.float64 if matrix.dtype == np.float64 else np.float32
+
+
+def top_k(scores: np.ndarray, k: int, min_score: float = 0.0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Indices and scores of the k best rows above min_score, best first
+
+    argpartition selects the candidates in linear time; only those k are sorted.
+    """
+    if k <= 0 or not len(scores):
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=scores.dtype)
+
+    if k < len(scores):
+        candidates = np.argpartition(scores, -k)[-k:]
+    else:
+        candidates = np.arange(len(scores))
+
+    candidates = candidates[scores[candidates] > min_score]
+    # Best score first; equal scores keep row order so results are deterministic
+    order = np.lexsort((candidates, -scores[candidates]))
+    indices = candidates[order]
+    return indices, scores[indices]
+
+
+def count_present(matrix: csr_matrix, rows: np.ndarray, columns: np.ndarray) -> np.ndarray:
+    """
+    For each of rows, how many of columns (distinct term ids) have a non-zero entry
+
+    The CSR rows are the per-chunk term-id sets built at index time, so this
+    is one np.isin over the candidates' stored indices and a bincount, with
+    no per-chunk text processing.
+    """
+    if not len(rows) or not len(columns):
+        return np.zeros(len(rows), dtype=np.int64)
+
+    candidates = matrix[rows]
+    row_ids = np.repeat(np.arange(len(rows)), np.diff(candidates.indptr))
+    present = np.isin(candidates.indices, columns) & (candidates.data != 0)
+    return np.bincount(row_ids[present], minlength=len(rows))
+
+
+def reciprocal_rank_fusion(rankings: List[np.ndarray], k: int, rrf_k: int = 60) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Fuse ranked row lists: each row scores sum(1 / (rrf_k + rank)) over the lists it appears in
+
+    Only ranks are used, so legs with incomparable score scales (cosine,
+    BM25, inner product) fuse fairly. Scores are divided by the best
+    possible fused score (rank 1 in every list) to land in [0, 1].
+    """
+    rankings = [np.asarray(ranking, dtype=np.int64) for ranking in rankings]
+    if not sum(len(ranking) for ranking in rankings):
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64)
+
+    rows = np.concatenate(rankings)
+    contributions = np.concatenate([1.0 / (rrf_k + np.arange(1, len(ranking) + 1)) for ranking in rankings])
+    unique_rows, inverse = np.unique(rows, return_inverse=True)
+    fused = np.bincount(inverse, weights=contributions) / (len(rankings) / (rrf_k + 1))
+
+    positions, scores = top_k(fused, k)
+    return unique_rows[positions], scores
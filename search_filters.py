@@ -0,0 +1,105 @@
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from chunk_table import ChunkTable
+
+
+class SearchFilters(NamedTuple):
+    """
+    Restricts a search to chunks from given documents, a page range and/or clause numbers
+
+    Every given criterion must hold; within one, any value may match. A row
+    collapsed from near-duplicates matches through any (source, page) it was
+    found at. Hashable, so it can be part of cache and batching keys.
+    """
+
+    sources: Tuple[str, ...] = ()
+    pages: Optional[Tuple[int, int]] = None
+    clauses: Tuple[str, ...] = ()
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict]) -> Optional['SearchFilters']:
+        """
+        Filters from a request body: {"sources": [...], "pages": [first, last], "clauses": [...]}
+
+        Returns None when nothing is selected; raises ValueError on malformed input.
+        """
+        if not data:
+            return None
+        if not isinstance(data, dict):
+            raise ValueError("filters must be an object")
+
+        sources = data.get('sources') or []
+        clauses = data.get('clauses') or []
+        if not isinstance(sources, list) or not all(isinstance(source, str) for source in sources):
+            raise ValueError("filters.sources must be a list of document names")
+        if not isinstance(clauses, list) or not all(isinstance(clause, str) for clause in clauses):
+            raise ValueError("filters.clauses must be a list of clause numbers")
+
+        pages = data.get('pages')
+        if pages is not None:
+            if (not isinstance(pages, list) or len(pages) != 2
+                    or not all(isinstance(page, int) and not isinstance(page, bool) for page in pages)):
+                raise ValueError("filters.pages must be [first, last] page numbers")
+            pages = (pages[0], pages[1])
+
+        filters = cls(tuple(sorted(set(sources))), pages, tuple(sorted(set(clauses))))
+        return filters if filters.is_active() else None
+
+    def is_active(self) -> bool:
+        return bool(self.sources) or self.pages is not None or bool(self.clauses)
+
+
+class MetadataIndex:
+    """
+    Column indexes over chunk locations for resolving SearchFilters to rows
+
+    Each row's own (source, page) and those of its collapsed near-duplicates
+    are the locations. They are grouped by source (offsets into a
+    source-sorted permutation), so selecting documents touches only their
+    locations, and the page range is then checked on those. Clause numbers
+    use the clause -> rows lookup already kept for find_clause. Built once
+    per index state, at load time.
+    """
+
+    def __init__(self, table: ChunkTable, clause_rows: Dict[str, List[int]]):
+        rows = len(table)
+        occurrence_rows = np.repeat(np.arange(rows, dtype=np.int64), np.diff(table.occurrence_offsets))
+        location_sources = np.concatenate([table.source_ids, table.occurrence_source_ids]).astype(np.int64)
+
+        self.rows = rows
+        self._location_rows = np.concatenate([np.arange(rows, dtype=np.int64), occurrence_rows])
+        self._location_pages = np.concatenate([table.pages, table.occurrence_pages])
+        self._by_source = np.argsort(location_sources, kind='stable')
+        self._source_offsets = np.zeros(len(table.sources) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(location_sources, minlength=len(table.sources)), out=self._source_offsets[1:])
+        self._source_ids = {source: source_id for source_id, source in enumerate(table.sources)}
+        self._clause_rows = clause_rows
+
+    def select(self, filters: Optional[SearchFilters]) -> Optional[np.ndarray]:
+        """
+        Sorted rows matching filters, or None when filters select every row
+        """
+        if filters is None or not filters.is_active():
+            return None
+
+        locations = None
+        if filters.sources:
+            source_ids = [self._source_ids[source] for source in filters.sources if source in self._source_ids]
+            locations = np.concatenate([np.zeros(0, dtype=np.int64)] + [
+                self._by_source[self._source_offsets[source_id]:self._source_offsets[source_id + 1]]
+                for source_id in source_ids
+            ])
+        if filters.pages is not None:
+            first, last = filters.pages
+            pages = self._location_pages if locations is None else self._location_pages[locations]
+            in_range = (pages >= first) & (pages <= last)
+            locations = np.flatnonzero(in_range) if locations is None else locations[in_range]
+
+        selected = np.unique(self._location_rows[locations]) if locations is not None else None
+        if filters.clauses:
+            clause_rows = np.unique(np.array([row for clause in filters.clauses
+                                              for row in self._clause_rows.get(clause, [])], dtype=np.int64))
+            selected = clause_rows if selected is None else np.intersect1d(selected, clause_rows, assume_unique=True)
+        return selected
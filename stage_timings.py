@@ -0,0 +1,45 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+
+class StageTimings:
+    """
+    Running count, total and maximum of per-stage latencies, shared across threads
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages: Dict[str, list] = {}
+
+    def record(self, stage: str, seconds: float):
+        with self._lock:
+            count_total_max = self._stages.setdefault(stage, [0, 0.0, 0.0])
+            count_total_max[0] += 1
+            count_total_max[1] += seconds
+            count_total_max[2] = max(count_total_max[2], seconds)
+
+    @contextmanager
+    def measure(self, stage: str, timings: Dict[str, float] = None):
+        """
+        Time a block; the duration is recorded and, if given, stored in timings[stage] (ms)
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.record(stage, elapsed)
+            if timings is not None:
+                timings[stage] = elapsed * 1000
+
+    def stats(self) -> Dict[str, Dict]:
+        """
+        Per-stage count, mean and max in milliseconds, for the metrics endpoint
+        """
+        with self._lock:
+            return {
+                stage: {'count': count, 'mean_ms': total / count * 1000, 'max_ms': maximum * 1000}
+                for stage, (count, total, maximum) in self._stages.items()
+            }
@@ -47,6 +47,8 @@ class InsuranceApp {
                 'ready': 'Ready',
                 'yes': 'Yes',
                 'no': 'No',
+                'searchIn': 'Search in',
+                'allDocuments': 'All documents',
                 'welcomeTitle': 'Insurance Document Analyzer',
                 'welcomeDesc': 'Upload policy documents and ask questions about your coverage, claims, and policy details.',
                 'selectedFiles': 'Selected files',
@@ -122,6 +124,8 @@ Feel free to ask another question!`
                 'ready': 'तैयार',
                 'yes': 'हाँ',
                 'no': 'नहीं',
+                'searchIn': 'इसमें खोजें',
+                'allDocuments': 'सभी दस्तावेज़',
                 'welcomeTitle': 'बीमा दस्तावेज़ विश्लेषक',
                 'welcomeDesc': 'पॉलिसी दस्तावेज़ अपलोड करें और अपने कवरेज, दावों और पॉलिसी विवरण के बारे में प्रश्न पूछें।',
                 'selectedFiles': 'चयनित फाइलें',
@@ -176,6 +180,8 @@ Feel free to ask another question!`
                 'ready': 'প্রস্তুত',
                 'yes': 'হ্যাঁ',
                 'no': 'না',
+                'searchIn': 'এতে খুঁজুন',
+                'allDocuments': 'সব নথিপত্র',
                 'welcomeTitle': 'বীমা নথি বিশ্লেষক',
                 'welcomeDesc': 'পলিসি নথি আপলোড করুন এবং আপনার কভারেজ, দাবি এবং পলিসি বিবরণ সম্পর্কে প্রশ্ন জিজ্ঞাসা করুন।',
                 'selectedFiles': 'নির্বাচিত ফাইল',
@@ -230,6 +236,8 @@ Feel free to ask another question!`
                 'ready': 'సిద్ధం',
                 'yes': 'అవును',
                 'no': 'లేదు',
+                'searchIn': 'ఇందులో వెతకండి',
+                'allDocuments': 'అన్ని పత్రాలు',
                 'welcomeTitle': 'బీమా పత్ర విశ్లేషకుడు',
                 'welcomeDesc': 'పాలసీ పత్రాలను అప్‌లోడ్ చేసి మీ కవరేజ్, దావాలు మరియు పాలసీ వివరాల గురించి ప్రశ్నలు అడగండి।',
                 'selectedFiles': 'ఎంచుకున్న ఫైల్‌లు',
@@ -305,6 +313,8 @@ Feel free to ask another question!`
                 'ready': 'तयार',
                 'yes': 'होय',
                 'no': 'नाही',
+                'searchIn': 'यामध्ये शोधा',
+                'allDocuments': 'सर्व कागदपत्रे',
                 'welcomeTitle': 'विमा दस्तऐवज विश्लेषक',
                 'welcomeDesc': 'पॉलिसी दस्तऐवज अपलोड करा आणि तुमच्या कव्हरेज, दावे आणि पॉलिसी तपशीलांबद्दल प्रश्न विचारा.',
                 'selectedFiles': 'निवडलेल्या फाइल्स',
@@ -380,6 +390,8 @@ Feel free to ask another question!`
                 'ready': 'தயார்',
                 'yes': 'ஆம்',
                 'no': 'இல்லை',
+                'searchIn': 'இதில் தேடு',
+                'allDocuments': 'அனைத்து ஆவணங்கள்',
                 'welcomeTitle': 'காப்பீட்டு ஆவண பகுப்பாய்வாளர்',
                 'welcomeDesc': 'கொள்கை ஆவணங்களை பதிவேற்றி உங்கள் கவரேஜ், உரிமைகோரல்கள் மற்றும் கொள்கை விவரங்கள் பற்றி கேள்விகள் கேளுங்கள்.',
                 'selectedFiles': 'தேர்ந்தெடுக்கப்பட்ட கோப்புகள்',
@@ -455,6 +467,8 @@ Feel free to ask another question!`
                 'ready': 'તૈયાર',
                 'yes': 'હા',
                 'no': 'ના',
+                'searchIn': 'આમાં શોધો',
+                'allDocuments': 'બધા દસ્તાવેજો',
                 'welcomeTitle': 'વીમા દસ્તાવેજ વિશ્લેષક',
                 'welcomeDesc': 'પોલિસી દસ્તાવેજો અપલોડ કરો અને તમારા કવરેજ, દાવાઓ અને પોલિસી વિગતો વિશે પ્રશ્નો પૂછો।',
                 'selectedFiles': 'પસંદ કરેલ ફાઇલો',
@@ -530,6 +544,8 @@ Feel free to ask another question!`
                 'ready': 'ಸಿದ್ಧ',
                 'yes': 'ಹೌದು',
                 'no': 'ಇಲ್ಲ',
+                'searchIn': 'ಇದರಲ್ಲಿ ಹುಡುಕಿ',
+                'allDocuments': 'ಎಲ್ಲಾ ದಾಖಲೆಗಳು',
                 'welcomeTitle': 'ವಿಮಾ ದಾಖಲೆ ವಿಶ್ಲೇಷಕ',
                 'welcomeDesc': 'ಪಾಲಿಸಿ ದಾಖಲೆಗಳನ್ನು ಅಪ್‌ಲೋಡ್ ಮಾಡಿ ಮತ್ತು ನಿಮ್ಮ ಕವರೇಜ್, ಹಕ್ಕುಗಳು ಮತ್ತು ಪಾಲಿಸಿ ವಿವರಗಳ ಬಗ್ಗೆ ಪ್ರಶ್ನೆಗಳನ್ನು ಕೇಳಿ.',
                 'selectedFiles': 'ಆಯ್ಕೆಮಾಡಿದ ಫೈಲ್‌ಗಳು',
@@ -605,6 +621,8 @@ Feel free to ask another question!`
                 'ready': 'തയ്യാറാണ്',
                 'yes': 'അതെ',
                 'no': 'അല്ല',
+                'searchIn': 'ഇതിൽ തിരയുക',
+                'allDocuments': 'എല്ലാ രേഖകളും',
                 'welcomeTitle': 'ഇൻഷുറൻസ് ഡോക്യുമെന്റ് അനലൈസർ',
                 'welcomeDesc': 'പോളിസി രേഖകൾ അപ്‌ലോഡ് ചെയ്യുകയും നിങ്ങളുടെ കവറേജ്, ക്ലെയിമുകൾ, പോളിസി വിശദാംശങ്ങൾ എന്നിവയെക്കുറിച്ച് ചോദ്യങ്ങൾ ചോദിക്കുകയും ചെയ്യുക।',
                 'selectedFiles': 'തിരഞ്ഞെടുത്ത ഫയലുകൾ',
@@ -680,6 +698,8 @@ Feel free to ask another question!`
                 'ready': 'ਤਿਆਰ',
                 'yes': 'ਹਾਂ',
                 'no': 'ਨਹੀਂ',
+                'searchIn': 'ਇਸ ਵਿੱਚ ਖੋਜੋ',
+                'allDocuments': 'ਸਾਰੇ ਦਸਤਾਵੇਜ਼',
                 'welcomeTitle': 'ਬੀਮਾ ਦਸਤਾਵੇਜ਼ ਵਿਸ਼ਲੇਸ਼ਕ',
                 'welcomeDesc': 'ਨੀਤੀ ਦਸਤਾਵੇਜ਼ ਅੱਪਲੋਡ ਕਰੋ ਅਤੇ ਆਪਣੇ ਕਵਰੇਜ, ਦਾਅਵਿਆਂ ਅਤੇ ਨੀਤੀ ਵੇਰਵਿਆਂ ਬਾਰੇ ਸਵਾਲ ਪੁੱਛੋ।',
                 'selectedFiles': 'ਚੁਣੀਆਂ ਫਾਈਲਾਂ',
@@ -755,6 +775,8 @@ Feel free to ask another question!`
                 'ready': 'ପ୍ରସ୍ତୁତ',
                 'yes': 'ହଁ',
                 'no': 'ନା',
+                'searchIn': 'ଏଥିରେ ଖୋଜନ୍ତୁ',
+                'allDocuments': 'ସମସ୍ତ ଦଲିଲପତ୍ର',
                 'welcomeTitle': 'ବୀମା ଦଲିଲ ବିଶ୍ଳେଷକ',
                 'welcomeDesc': 'ପଲିସି ଦଲିଲ ଅପଲୋଡ୍ କରନ୍ତୁ ଏବଂ ଆପଣଙ୍କ କଭରେଜ୍, ଦାବି ଏବଂ ପଲିସି ବିବରଣୀ ବିଷୟରେ ପ୍ରଶ୍ନ ପଚାରନ୍ତୁ।',
                 'selectedFiles': 'ଚୟନିତ ଫାଇଲ୍ଗୁଡ଼ିକ',
@@ -830,6 +852,8 @@ Feel free to ask another question!`
                 'ready': 'প্ৰস্তুত',
                 'yes': 'হয়',
                 'no': 'নাই',
+                'searchIn': 'ইয়াত বিচাৰক',
+                'allDocuments': 'সকলো নথিপত্ৰ',
                 'welcomeTitle': 'বীমা নথি বিশ্লেষক',
                 'welcomeDesc': 'নীতি নথিসমূহ আপলোড কৰক আৰু আপোনাৰ কভাৰেজ, দাবী আৰু নীতিৰ বিৱৰণৰ বিষয়ে প্ৰশ্ন সুধিব।',
                 'selectedFiles': 'নিৰ্বাচিত ফাইল',
@@ -1134,11 +1158,28 @@ Feel free to ask another question!`
             document.getElementById('docCount').textContent = status.documents_loaded || 0;
             document.getElementById('vectorStatus').textContent = 
                 status.vector_store_ready ? this.getText('yes') : this.getText('no');
+            this.updateDocumentSelect(status.documents || []);
         } catch (error) {
             console.error('Status update error:', error);
         }
     }
 
+    updateDocumentSelect(documents) {
+        // One option per uploaded file; the current choice is kept while that file is still loaded
+        const select = document.getElementById('documentSelect');
+        if (!select) return;
+
+        const selected = documents.includes(select.value) ? select.value : '';
+        select.length = 1;
+        documents.forEach(name => select.add(new Option(name, name)));
+        select.value = selected;
+    }
+
+    getSearchFilters() {
+        const select = document.getElementById('documentSelect');
+        return select && select.value ? { sources: [select.value] } : null;
+    }
+
     // Chat Functionality
     async handleSend() {
         const queryInput = document.getElementById('queryInput');
@@ -1174,7 +1215,8 @@ Feel free to ask another question!`
                 },
                 body: JSON.stringify({ 
                     query: query,
-                    language: this.currentLanguage 
+                    language: this.currentLanguage,
+                    filters: this.getSearchFilters()
                 })
             });
 
@@ -1663,6 +1705,11 @@ Feel free to ask another question!`
             statusLabels[1].textContent = this.getText('ready');
         }
 
+        const scopeLabel = document.querySelector('.scope-label');
+        if (scopeLabel) scopeLabel.textContent = this.getText('searchIn');
+        const allDocumentsOption = document.querySelector('#documentSelect option[value=""]');
+        if (allDocumentsOption) allDocumentsOption.textContent = this.getText('allDocuments');
+
         const vectorStatus = document.getElementById('vectorStatus');
         if (vectorStatus) {
             vectorStatus.textContent = vectorStatus.textContent === 'Yes' ? this.getText('yes') : this.getText('no');
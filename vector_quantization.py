@@ -0,0 +1,53 @@
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+# Storage types for TF-IDF weights: exact, half the bytes, or 8-bit with a per-row scale
+VECTOR_DTYPES = ('float64', 'float32', 'uint8')
+
+# Rows converted to float32 at a time when scoring 8-bit rows
+BLOCK_ROWS = 16384
+
+
+def encode_rows(matrix: csr_matrix, dtype: str) -> Tuple[csr_matrix, Optional[np.ndarray]]:
+    """
+    TF-IDF rows stored as dtype, plus the per-row scales of 8-bit rows (None otherwise)
+
+    TF-IDF weights are non-negative, so 8-bit rows use all 255 levels: each
+    weight becomes round(weight / scale) with scale = row max / 255, at least
+    1 so that every stored term stays present. A row's score is its 8-bit dot
+    product times its scale.
+    """
+    if dtype not in VECTOR_DTYPES:
+        raise ValueError(f"Unknown vector dtype {dtype!r}, expected one of {VECTOR_DTYPES}")
+    if dtype != 'uint8':
+        return matrix.astype(dtype, copy=matrix.dtype != dtype), None
+
+    row_ids = np.repeat(np.arange(matrix.shape[0]), np.diff(matrix.indptr))
+    scales = np.asarray(matrix.max(axis=1).todense(), dtype=np.float64).ravel() / 255
+    scales[scales == 0] = 1.0
+    levels = np.clip(np.rint(matrix.data / scales[row_ids]), 1, 255).astype(np.uint8)
+    quantized = csr_matrix((levels, matrix.indices.copy(), matrix.indptr.copy()), shape=matrix.shape)
+    return quantized, scales.astype(np.float32)
+
+
+def decode_rows(matrix: csr_matrix, scales: Optional[np.ndarray]) -> csr_matrix:
+    """
+    float64 rows of a matrix stored by encode_rows
+    """
+    decoded = matrix.astype(np.float64)
+    if scales is not None:
+        decoded.data *= np.repeat(scales.astype(np.float64), np.diff(matrix.indptr))
+    return decoded
+
+
+def float32_blocks(matrix: csr_matrix, block_rows: int = BLOCK_ROWS) -> Iterator[csr_matrix]:
+    """
+    Consecutive row blocks of matrix as float32, so a product never upcasts the whole matrix at once
+    """
+    for start in range(0, matrix.shape[0], block_rows):
+        end = min(start + block_rows, matrix.shape[0])
+        first, last = matrix.indptr[start], matrix.indptr[end]
+        yield csr_matrix((matrix.data[first:last].astype(np.float32), matrix.indices[first:last],
+                          matrix.indptr[start:end + 1] - first), shape=(end - start, matrix.shape[1]))
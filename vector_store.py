@@ -1,132 +1,479 @@
 import numpy as np
-import pickle
-import os
 import re
-from typing import List, Dict
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from typing import Iterable, Iterator, List, Dict, NamedTuple, Optional, Tuple
+from scipy.sparse import csr_matrix, vstack
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from bm25_index import BM25Index
+from chunk_table import ChunkTable, ChunkTableBuilder
+from dedup import MinHashDeduplicator
+from dense_index import DenseIndex
+from index_snapshots import SnapshotStore
+from incremental_vectorizer import IncrementalTfidfVectorizer
+from index_state import IndexState
+from keyword_matcher import KeywordMatcher
+from query_cache import QueryCache
+from search_filters import SearchFilters
+from scoring import count_present, reciprocal_rank_fusion, score_rows, score_rows_many, top_k
+from stage_timings import StageTimings
+from vector_quantization import VECTOR_DTYPES, decode_rows, encode_rows
 
 logger = logging.getLogger(__name__)
 
+RETRIEVAL_ENGINES = ('tfidf', 'bm25', 'dense', 'hybrid')
+
+
+class _PendingAppend(NamedTuple):
+    """
+    A built but unpublished append: the next snapshot's parts, on top of start base rows
+    """
+
+    start: int
+    table: ChunkTable
+    vectorizer: IncrementalTfidfVectorizer
+    vectors: csr_matrix
+    vector_scales: Optional[np.ndarray]
+    bm25: Optional[BM25Index]
+    dense: Optional[DenseIndex]
+    clause_rows: Dict[str, List[int]]
+    dedup_signatures: np.ndarray
+    new_signatures: np.ndarray
+
+
 class VectorStore:
-    def __init__(self, max_features: int = 5000):
-        self.vectorizer = TfidfVectorizer(
-            max_features=max_features,
-            stop_words='english',
-            ngram_range=(1, 2),
-            min_df=1,
-            max_df=0.9
-        )
-        self.vectors = None
-        self.documents = []
-        self.is_fitted = False
+    def __init__(self, retrieval_engine: str = 'tfidf', encoder=None, query_cache_size: int = 1024,
+                 keyword_matcher: KeywordMatcher = None, vector_dtype: str = 'float64', min_bigram_df: int = 1,
+                 max_df: float = 1.0, max_features: Optional[int] = None):
+        if retrieval_engine not in RETRIEVAL_ENGINES:
+            raise ValueError(f"Unknown retrieval engine {retrieval_engine!r}, expected one of {RETRIEVAL_ENGINES}")
+        if vector_dtype not in VECTOR_DTYPES:
+            raise ValueError(f"Unknown vector dtype {vector_dtype!r}, expected one of {VECTOR_DTYPES}")
+        if not 0.0 < max_df <= 1.0:
+            raise ValueError(f"max_df must be in (0, 1], got {max_df}")
+        if retrieval_engine in ('dense', 'hybrid') and encoder is None:
+            raise ValueError(f"The {retrieval_engine} retrieval engine needs an encoder")
+
+        # Every snapshot holds the TF-IDF matrix, plus the BM25 postings for the
+        # BM25 engine and dense embeddings when an encoder is configured
+        self.retrieval_engine = retrieval_engine
+        self.encoder = encoder
+        self.with_bm25 = retrieval_engine == 'bm25'
+        # Everything searches read, swapped as a whole; readers take no lock
+        self.state = IndexState.empty(0, encoder, self.with_bm25)
+        # Hybrid mode: each leg fetches k * hybrid_depth candidates before rank fusion
+        self.hybrid_depth = 4
+        self.rrf_k = 60
+        self.timings = StageTimings()
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        # Ranked results per (normalized query, k, generation); 0 disables caching
+        self.query_cache = QueryCache(query_cache_size)
+        # Compact index mode: TF-IDF weights stored as float32 or 8-bit, and
+        # bigrams seen in fewer than min_bigram_df chunks left out of new rows
+        self.vector_dtype = vector_dtype
+        self.min_bigram_df = min_bigram_df
+        # Vocabulary bounds: terms in more than max_df of the chunks are left out
+        # of new rows and queries, and no terms are added past max_features
+        self.max_df = max_df
+        self.max_features = max_features
+        # Term dictionaries for chunk filtering and structured query parsing
+        self.keywords = keyword_matcher if keyword_matcher is not None else KeywordMatcher()
+        # Writer-side state: only touched with _write_lock held
+        self.deduplicator = None
+        # Stored MinHash signatures are reused only if computed with these settings
+        self.dedup_params = MinHashDeduplicator().params()
+        self._write_lock = threading.Lock()
         self.vector_db_path = 'vector_db'
-        self.vectorizer_file = os.path.join(self.vector_db_path, 'vectorizer.pkl')
-        self.vectors_file = os.path.join(self.vector_db_path, 'vectors.pkl')
-        self.docs_file = os.path.join(self.vector_db_path, 'documents.pkl')
+        self.snapshots = SnapshotStore(self.vector_db_path)
+        self._snapshot_signature = None
 
-        # Load existing vectors if available
-        self._load_vectors()
+        # Load the current snapshot if one has been published
+        self.refresh()
 
-    def add_documents(self, documents: List[Dict]):
+    def add_documents(self, documents: Iterable[Dict]):
         """
-        Replace all documents in the vector store with new ones
+        Append documents to the vector store
+
+        Accepts any iterable of chunks (typically DocumentProcessor.iter_chunks)
+        and consumes it chunk by chunk into a columnar ChunkTable, so no list
+        of chunk dicts is ever held. Only the new rows are vectorized, against
+        the vectorizer's growing vocabulary, and stacked under the existing
+        matrix, so the cost of an upload scales with the upload, not the corpus.
+
+        Extraction and vectorizing run without any lock, on top of the
+        generation being served. The write locks are only held to publish the
+        result as a new snapshot generation: if another thread or worker
+        published first, the staged upload is rebuilt on top of that generation
+        before publishing, so concurrent appends still apply one after another.
+        The new state is built beside the one being searched and swapped in
+        when complete.
         """
         try:
-            logger.info(f"Replacing vector store with {len(documents)} new documents")
-
-            # Clear existing documents and start fresh
-            self.documents = []
-            
-            # Filter documents to keep only relevant content
-            filtered_documents = []
-            for doc in documents:
-                if self._is_relevant_content(doc['text']):
-                    filtered_documents.append(doc)
-            
-            logger.info(f"Filtered to {len(filtered_documents)} relevant documents from {len(documents)} total")
-            
-            if not filtered_documents:
+            staged, signatures = self._stage_documents(documents)
+            if not len(staged):
                 logger.warning("No relevant documents found after filtering")
                 return
-            
-            # Extract texts for vectorization
-            texts = [doc['text'] for doc in filtered_documents]
 
-            # Set filtered documents as the collection
-            self.documents = filtered_documents
-
-            # Fit the vectorizer on new texts only
-            self.vectors = self.vectorizer.fit_transform(texts)
-            self.is_fitted = True
-
-            # Save to disk
-            self._save_vectors()
-
-            logger.info(f"Successfully replaced vector store with {len(filtered_documents)} relevant documents")
+            with self._write_lock:
+                # Another worker may have published since this one last looked
+                self._load_current()
+                state, deduplicator = self.state, self._get_deduplicator()
+            pending = self._build_append(state, deduplicator, staged, signatures)
 
         except Exception as e:
             logger.error(f"Error adding documents to vector store: {str(e)}")
             raise
 
-    def search_documents(self, query: str, k: int = 5) -> List[Dict]:
+        with self._write_lock:
+            try:
+                with self.snapshots.write_lock():
+                    self._load_current()
+                    if self.state is not state:
+                        logger.info(f"Generation {self.state.generation} was published meanwhile, "
+                                    f"rebuilding the upload on top of it")
+                        state, deduplicator = self.state, self._get_deduplicator()
+                        pending = self._build_append(state, deduplicator, staged, signatures)
+                    self._publish_append(pending, deduplicator)
+
+            except Exception as e:
+                logger.error(f"Error adding documents to vector store: {str(e)}")
+                # The served state was never modified, but the snapshot may have
+                # been published already
+                self.deduplicator = None
+                self._snapshot_signature = None
+                self._load_current()
+                raise
+
+    def _stage_documents(self, documents: Iterable[Dict]) -> Tuple[ChunkTable, np.ndarray]:
+        """
+        The relevant chunks of an upload as a standalone ChunkTable, plus each row's MinHash signature
+        """
+        builder = ChunkTableBuilder()
+        hasher = MinHashDeduplicator()
+        signatures = []
+        stats = {'seen': 0}
+
+        # Filter documents to keep only relevant content, as a streaming stage
+        for doc in self._filter_relevant(documents, stats):
+            builder.append(doc)
+            signatures.append(hasher.signature(doc['text']))
+
+        logger.info(f"Staged {builder.new_rows} relevant chunks from {stats['seen']} total")
+        return builder.build(), np.array(signatures, dtype=np.uint64).reshape(len(signatures), hasher.num_perm)
+
+    def _build_append(self, state: IndexState, deduplicator: MinHashDeduplicator, staged: ChunkTable,
+                      signatures: np.ndarray) -> _PendingAppend:
+        """
+        Everything the next snapshot holds: state plus the staged rows that are not near-duplicates
+
+        deduplicator describes state and is only read here, so that other
+        threads can build on it at the same time; the upload's own rows are
+        matched against each other in a private one.
+        """
+        builder = ChunkTableBuilder(base=state.table)
+        start = len(state.table)
+        upload_rows = MinHashDeduplicator()
+        new_signatures = []
+        duplicates = 0
+
+        for row, signature in enumerate(signatures):
+            doc = {'text': staged.text(row), 'metadata': staged.metadata(row)}
+            # Near-identical chunks (repeated definitions, exclusion lists) are
+            # indexed once, also across uploads; the copy only adds its location
+            # to the kept row
+            duplicate_of = deduplicator.find(signature, below=start)
+            if duplicate_of is None:
+                duplicate_of = upload_rows.find(signature)
+            if duplicate_of is None:
+                upload_rows.add_signatures(signature[np.newaxis], len(builder))
+                new_signatures.append(signature)
+                builder.append(doc)
+            else:
+                builder.add_occurrence(duplicate_of, doc)
+                duplicates += 1
+
+        logger.info(f"Appending {builder.new_rows} new relevant documents to generation {state.generation} "
+                    f"({duplicates} near-duplicates collapsed)")
+
+        # Vectorize the new rows only, streaming their texts out of the table
+        table = builder.build()
+        vectorizer, vectors, vector_scales = state.vectorizer, state.vectors, state.vector_scales
+        bm25, dense = state.bm25, state.dense
+        # A batch made only of duplicates adds occurrences but no rows to vectorize
+        if builder.new_rows:
+            # Grown on a copy: searches running on the current state keep its vocabulary
+            vectorizer = vectorizer.copy()
+            counts = vectorizer.partial_fit_counts(table.texts(start), self.max_features)
+            if self.max_features is not None and vectorizer.n_features >= self.max_features:
+                logger.warning(f"Vocabulary is at max_features ({self.max_features} terms): new terms are not indexed")
+            # BM25 keeps every term; only the TF-IDF rows are pruned and quantized
+            pruned = vectorizer.prune_common_terms(vectorizer.prune_rare_bigrams(counts, self.min_bigram_df),
+                                                   self.max_df)
+            new_vectors, new_scales = encode_rows(vectorizer.weight(pruned), self.vector_dtype)
+            if vectors is None or not start:
+                vectors, vector_scales = new_vectors, new_scales
+            else:
+                if vectors.dtype != new_vectors.dtype:
+                    # Stored with another vector_dtype setting: convert the earlier rows once
+                    logger.info(f"Converting {start} rows from {vectors.dtype} to {self.vector_dtype}")
+                    vectors, vector_scales = encode_rows(decode_rows(vectors, vector_scales), self.vector_dtype)
+                # Earlier rows have no entries in columns for terms first seen now
+                widened = csr_matrix((vectors.data, vectors.indices, vectors.indptr),
+                                     shape=(start, vectorizer.n_features), copy=False)
+                vectors = vstack([widened, new_vectors], format='csr')
+                if new_scales is not None:
+                    vector_scales = np.concatenate([vector_scales, new_scales])
+            if bm25 is not None:
+                bm25 = bm25.append(counts) if start else BM25Index.from_counts(counts)
+            if dense is not None:
+                # Encoded in batches as the texts stream out of the table
+                dense = dense.append(table.texts(start))
+        clause_rows = table.clause_rows(start, state.clause_rows)
+
+        # Stored with the snapshot so other workers (and restarts) skip rehashing
+        new_signatures = np.array(new_signatures, dtype=np.uint64).reshape(len(new_signatures), signatures.shape[1])
+        if state.dedup_signatures is not None and len(state.dedup_signatures) == start:
+            dedup_signatures = np.concatenate([state.dedup_signatures, new_signatures])
+        else:
+            dedup_signatures = np.concatenate([deduplicator.signatures(range(start)), new_signatures])
+
+        return _PendingAppend(start, table, vectorizer, vectors, vector_scales, bm25, dense, clause_rows,
+                              dedup_signatures, new_signatures)
+
+    def _publish_append(self, pending: _PendingAppend, deduplicator: MinHashDeduplicator):
+        """
+        Publish an append built on the served state and serve it; call with both write locks held
+        """
+        # Publish, then serve the snapshot from its memory maps rather than the heap copies
+        generation = self.snapshots.publish(pending.vectorizer, pending.vectors, pending.table, pending.bm25,
+                                            pending.dense, pending.vector_scales, pending.dedup_signatures,
+                                            self.dedup_params)
+        # Only now does the shared deduplicator learn the new rows
+        deduplicator.add_signatures(pending.new_signatures, pending.start)
+        self.deduplicator = deduplicator
+        self._install(IndexState.load(generation, self.snapshots.current()[1], self.encoder, pending.clause_rows,
+                                      self.dedup_params, self.with_bm25), keep_deduplicator=True)
+
+        logger.info(f"Vector store now holds {len(pending.table)} documents "
+                    f"({len(pending.table) - pending.start} added)")
+
+    def _get_deduplicator(self) -> MinHashDeduplicator:
+        """
+        The deduplicator covering every stored row, rebuilt from the snapshot after a load
+        """
+        if self.deduplicator is None:
+            deduplicator = MinHashDeduplicator()
+            state = self.state
+            if state.dedup_signatures is not None and len(state.dedup_signatures) == len(state):
+                # Stored with the snapshot: only the LSH buckets are rebuilt
+                deduplicator.add_signatures(state.dedup_signatures)
+            else:
+                # Snapshot without (matching) signatures: hash every stored text once
+                logger.info(f"Computing MinHash signatures of {len(state)} stored chunks")
+                for row, text in enumerate(state.table.texts()):
+                    deduplicator.add_signatures(deduplicator.signature(text)[np.newaxis], row)
+            self.deduplicator = deduplicator
+        return self.deduplicator
+
+    def _filter_relevant(self, documents: Iterable[Dict], stats: Dict[str, int]) -> Iterator[Dict]:
+        """
+        Lazily drop irrelevant chunks, counting everything that passes through
+        """
+        for doc in documents:
+            stats['seen'] += 1
+            if self._is_relevant_content(doc['text']):
+                yield doc
+
+    def search_documents(self, query: str, k: int = 5, filters: Optional[SearchFilters] = None) -> List[Dict]:
         """
         Search for relevant documents using semantic similarity with improved parsing
         """
-        if not self.vectorizer or not self.vectors.size:
+        return self.search_many([query], k, filters)[0]
+
+    def search_many(self, queries: List[str], k: int = 5,
+                    filters: Optional[SearchFilters] = None) -> List[List[Dict]]:
+        """
+        Search for several queries at once; results match search_documents query by query
+
+        The TF-IDF scoring of all queries not already cached is one vectorizer
+        transform and one sparse matrix-matrix product over the corpus instead
+        of a full pass per query. Repeated queries are searched once.
+
+        filters restricts all queries to the matching chunks (e.g. selected
+        documents); only those rows are scored.
+        """
+        # One state for the whole batch, however many appends land meanwhile
+        state = self.state
+        if not state.is_fitted:
             logger.warning("Vector store is empty")
-            return []
+            return [[] for _ in queries]
+
+        rows = state.metadata.select(filters)
+        if rows is not None and not len(rows):
+            logger.info(f"No documents match filters {filters}")
+            return [[] for _ in queries]
 
+        results: List[List[Dict]] = [[] for _ in queries]
         try:
-            # Parse structured queries like "46M, knee surgery, Pune, 3-month policy"
-            parsed_terms = self._parse_structured_query(query)
-            expanded_query = f"{query} {' '.join(parsed_terms)}"
-
-            # Transform query to vector
-            query_vector = self.vectorizer.transform([expanded_query])
-
-            # Calculate cosine similarity
-            similarities = cosine_similarity(query_vector, self.vectors)[0]
-
-            # Get top k results with lower threshold for better recall
-            top_indices = similarities.argsort()[-k:][::-1]
-
-            results = []
-            for idx in top_indices:
-                if similarities[idx] > 0.01:  # Lower threshold for better recall
-                    doc = self.documents[idx].copy()
-                    doc['similarity_score'] = float(similarities[idx])
-
-                    # Boost relevance for key medical terms and query terms
-                    text_lower = doc.get('text', '').lower()
-                    query_words = set(query.lower().split())
-                    
-                    # Boost for parsed medical terms
-                    for term in parsed_terms:
-                        if term.lower() in text_lower:
-                            doc['similarity_score'] = min(1.0, doc['similarity_score'] * 1.3)
-                    
-                    # Boost for direct query word matches
-                    text_words = set(text_lower.split())
-                    common_words = query_words.intersection(text_words)
-                    if common_words:
-                        boost_factor = min(1.5, 1.0 + len(common_words) * 0.1)
-                        doc['similarity_score'] = min(1.0, doc['similarity_score'] * boost_factor)
-
-                    results.append(doc)
-
-            logger.info(f"Search results before filtering: {len(results)} documents with scores: {[r['similarity_score'] for r in results[:5]]}")
-
-            # Sort by similarity score
-            results.sort(key=lambda x: x['similarity_score'], reverse=True)
-
-            logger.info(f"Found {len(results)} relevant documents for query: {query}")
+            # Case and spacing do not change the ranking, so equivalent queries share a cache entry
+            pending: Dict[str, List[int]] = {}
+            for position, query in enumerate(queries):
+                query = self._normalize_query(query)
+                cached = self.query_cache.get((query, k, filters, state.generation))
+                if cached is not None:
+                    results[position] = [state.table.view(idx, score) for idx, score in zip(*cached)]
+                else:
+                    pending.setdefault(query, []).append(position)
+            if not pending:
+                return results
+
+            timings = {}
+            with self.timings.measure('total', timings):
+                with self.timings.measure('parse', timings):
+                    # Parse structured queries like "46M, knee surgery, Pune, 3-month policy"
+                    parsed_terms = [self._parse_structured_query(query) for query in pending]
+                    expanded_queries = [f"{query} {' '.join(terms)}" for query, terms in zip(pending, parsed_terms)]
+
+                retrieved = self._retrieve_many(state, expanded_queries, k, rows, timings)
+
+                ranked = []
+                with self.timings.measure('boost', timings):
+                    for query, terms, (top_indices, top_scores) in zip(pending, parsed_terms, retrieved):
+                        # Boost relevance for key medical terms and query terms, for the shortlist only
+                        boosted = self._boost_scores(state, top_indices, top_scores, terms, query)
+                        # Sort by similarity score (stable, so ties keep retrieval order)
+                        scores = boosted.tolist()
+                        order = sorted(range(len(scores)), key=scores.__getitem__, reverse=True)
+                        ranked.append((tuple(top_indices[order].tolist()), tuple(scores[i] for i in order)))
+
+            for query, rows_scores in zip(pending, ranked):
+                # Only row numbers and scores are kept; views are rebuilt on a hit
+                self.query_cache.put((query, k, filters, state.generation), rows_scores)
+                for position in pending[query]:
+                    # Results are lightweight views over the chunk table, not copies
+                    results[position] = [state.table.view(idx, score) for idx, score in zip(*rows_scores)]
+
+                logger.info(f"Found {len(rows_scores[0])} relevant documents for query: {query} "
+                            f"with scores: {list(rows_scores[1][:5])}")
+            scope = f", {len(rows)} of {len(state)} rows" if rows is not None else ""
+            logger.info(f"Searched {len(pending)} queries ({self.retrieval_engine}{scope}, stages ms: "
+                        f"{', '.join(f'{stage}={ms:.1f}' for stage, ms in timings.items())})")
             return results
 
         except Exception as e:
             logger.error(f"Error searching documents: {str(e)}")
-            return []
+            if len(queries) > 1:
+                # Search each query alone, so a bad query only fails itself
+                return [self.search_many([query], k, filters)[0] for query in queries]
+            return [[]]
+
+    @staticmethod
+    def _normalize_query(query: str) -> str:
+        return ' '.join(query.lower().split())
+
+    def _retrieve_many(self, state: IndexState, expanded_queries: List[str], k: int, rows: Optional[np.ndarray],
+                       timings: Dict[str, float]) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Top-k row indices and scores of each query from the configured engine, best first
+
+        rows, when given, are the only rows scored.
+        """
+        if self.retrieval_engine == 'hybrid':
+            # Both legs fetch a deeper candidate list; the dense leg runs on the
+            # pool while the lexical leg runs here (both release the GIL in
+            # their numeric kernels)
+            depth = k * self.hybrid_depth
+            dense_legs = self._get_executor().submit(self._timed, 'dense', timings, self._dense_legs,
+                                                     state, expanded_queries, depth, rows)
+            lexical_legs = self._timed('lexical', timings, self._lexical_legs, state, expanded_queries, depth, rows)
+            dense_legs = dense_legs.result()
+
+            with self.timings.measure('fusion', timings):
+                return [reciprocal_rank_fusion([lexical_indices, dense_indices], k, rrf_k=self.rrf_k)
+                        for (lexical_indices, _), (dense_indices, _) in zip(lexical_legs, dense_legs)]
+
+        with self.timings.measure('retrieve', timings):
+            if self.retrieval_engine == 'dense':
+                return self._dense_legs(state, expanded_queries, k, rows)
+            if self.retrieval_engine == 'bm25':
+                # Only the posting lists of each query's terms are read
+                return [state.bm25.search(state.vectorizer.term_ids(query), k, min_score=0.01, rows=rows)
+                        for query in expanded_queries]
+            return self._lexical_legs(state, expanded_queries, k, rows)
+
+    def _lexical_legs(self, state: IndexState, expanded_queries: List[str], k: int, rows: Optional[np.ndarray]):
+        # Score every row (or only the filtered rows) against every query, then select each query's top k
+        query_vectors = state.vectorizer.transform(expanded_queries, self.max_df)
+        vectors, scales = state.vectors, state.vector_scales
+        if rows is not None:
+            vectors, scales = vectors[rows], scales[rows] if scales is not None else None
+        if len(expanded_queries) == 1:
+            similarities = [score_rows(vectors, query_vectors, scales)]
+        else:
+            similarities = score_rows_many(vectors, query_vectors, scales)
+        legs = [top_k(scores, k, min_score=0.01) for scores in similarities]  # Lower threshold for better recall
+        if rows is not None:
+            # Positions in the filtered rows back to row indices (rows are sorted, so tie order is kept)
+            legs = [(rows[positions], scores) for positions, scores in legs]
+        return legs
+
+    def _dense_legs(self, state: IndexState, expanded_queries: List[str], k: int, rows: Optional[np.ndarray]):
+        # Nearest neighbours of each question's embedding, so paraphrases and
+        # translated wording can match without shared terms. Searched one query
+        # at a time: batched FAISS searches and batched encoding round
+        # differently, and results must not depend on the batch
+        return [state.dense.search(query, k, min_score=0.01, rows=rows) for query in expanded_queries]
+
+    def _timed(self, stage: str, timings: Dict[str, float], fn, *args):
+        with self.timings.measure(stage, timings):
+            return fn(*args)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # Created on first use so no threads exist before gunicorn forks workers
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='hybrid-search')
+            return self._executor
+
+    def _boost_scores(self, state: IndexState, indices: np.ndarray, scores: np.ndarray,
+                      parsed_terms: List[str], query: str) -> np.ndarray:
+        """
+        Apply the parsed-term and query-word boosts to the top hits
+
+        Term presence is read from the hits' rows of the TF-IDF matrix (their
+        term ids, built at index time) instead of lowercasing and splitting
+        each chunk's text, so the cost does not depend on chunk length.
+        """
+        vocabulary = state.vectorizer.vocabulary
+
+        # x1.3 per parsed medical term the chunk contains, capped at 1.0
+        term_ids = np.array(sorted({vocabulary[term.lower()] for term in parsed_terms
+                                    if term.lower() in vocabulary}), dtype=np.int64)
+        term_hits = count_present(state.vectors, indices, term_ids)
+        boosted = np.minimum(1.0, scores * 1.3 ** term_hits)
+
+        # x(1 + 0.1 per distinct query word in the chunk), at most x1.5, capped at 1.0
+        word_ids = np.array(sorted({vocabulary[term] for term in state.vectorizer.analyze(query)
+                                    if ' ' not in term and term in vocabulary}), dtype=np.int64)
+        word_hits = count_present(state.vectors, indices, word_ids)
+        return np.minimum(1.0, boosted * np.minimum(1.5, 1.0 + word_hits * 0.1))
+
+    def find_clause(self, number: str, k: int = 5, filters: Optional[SearchFilters] = None) -> List[Dict]:
+        """
+        Look up the chunks of a clause by its number (e.g. "4.2.1") without running a search
+        """
+        state = self.state
+        clause_rows = state.clause_rows.get(number, [])
+        rows = state.metadata.select(filters)
+        if rows is not None:
+            selected = set(rows.tolist())
+            clause_rows = [idx for idx in clause_rows if idx in selected]
+        results = [state.table.view(idx, 1.0) for idx in clause_rows[:k]]
+
+        logger.info(f"Clause lookup for {number}: {len(results)} chunks")
+        return results
 
     def _parse_structured_query(self, query: str) -> List[str]:
         """
@@ -135,6 +482,9 @@ class VectorStore:
         import re
 
         terms = []
+        query_lower = query.lower()
+        # Medical terms, body parts and cities, all found in one scan of the query
+        found = self.keywords.find(query_lower)
 
         # Extract age patterns (e.g., "46M", "46-year-old")
         age_match = re.search(r'(\d+)[M|F|m|f]?[-\s]?(?:year|yr)', query, re.IGNORECASE)
@@ -142,16 +492,10 @@ class VectorStore:
             terms.append("age")
 
         # Extract medical procedures
-        medical_terms = ['surgery', 'operation', 'treatment', 'procedure', 'therapy']
-        for term in medical_terms:
-            if term.lower() in query.lower():
-                terms.append(term)
+        terms.extend(found['medical_terms'])
 
         # Extract body parts
-        body_parts = ['knee', 'hip', 'heart', 'eye', 'spine', 'shoulder', 'ankle']
-        for part in body_parts:
-            if part.lower() in query.lower():
-                terms.append(part)
+        terms.extend(found['body_parts'])
 
         # Extract policy duration patterns
         duration_match = re.search(r'(\d+)[-\s]?(?:month|year|day)', query, re.IGNORECASE)
@@ -159,18 +503,44 @@ class VectorStore:
             terms.extend(["waiting period", "policy duration"])
 
         # Extract location terms
-        location_terms = ['pune', 'mumbai', 'delhi', 'bangalore', 'chennai', 'hyderabad']
-        for location in location_terms:
-            if location.lower() in query.lower():
-                terms.append("location")
+        if found['locations']:
+            terms.append("location")
 
         return list(set(terms))  # Remove duplicates
 
+    @property
+    def generation(self) -> int:
+        return self.state.generation
+
     def get_document_count(self) -> int:
         """
         Get the number of documents in the store
         """
-        return len(self.documents)
+        return len(self.state)
+
+    def matrix_stats(self) -> Dict:
+        """
+        Storage of the TF-IDF matrix being served, for the metrics endpoint
+        """
+        state = self.state
+        vectors, scales = state.vectors, state.vector_scales
+        bounds = {'min_bigram_df': self.min_bigram_df, 'max_df': self.max_df, 'max_features': self.max_features,
+                  'features': state.vectorizer.n_features}
+        if vectors is None:
+            return {'dtype': self.vector_dtype, **bounds, 'stored_entries': 0, 'bytes': 0}
+        nbytes = vectors.data.nbytes + vectors.indices.nbytes + vectors.indptr.nbytes
+        return {
+            'dtype': str(vectors.dtype),
+            **bounds,
+            'stored_entries': int(vectors.nnz),
+            'bytes': int(nbytes + (scales.nbytes if scales is not None else 0))
+        }
+
+    def get_sources(self) -> List[str]:
+        """
+        Names of the uploaded files the stored chunks come from, for scoping searches
+        """
+        return list(self.state.table.sources)
 
     def clear_all_documents(self):
         """
@@ -178,123 +548,104 @@ class VectorStore:
         """
         try:
             logger.info("Clearing all documents from vector store")
-            self.documents = []
-            self.vectors = None
-            self.is_fitted = False
-            
-            # Remove stored files
-            import glob
-            for file_path in [self.vectorizer_file, self.vectors_file, self.docs_file]:
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-                    
+            with self._write_lock, self.snapshots.write_lock():
+                generation = self.snapshots.publish_empty()
+                self._install(IndexState.empty(generation, self.encoder, self.with_bm25))
+
             logger.info("Successfully cleared vector store")
         except Exception as e:
             logger.error(f"Error clearing vector store: {str(e)}")
 
-    def _save_vectors(self):
+    def refresh(self) -> bool:
         """
-        Save vectorizer, vectors and documents to disk
+        Swap to the current snapshot if another worker has published a newer generation
+
+        Cheap enough to call before every request: unless CURRENT has been
+        replaced since the last call, this is a single stat(). While a writer
+        in this process holds the write lock, the check is skipped: the
+        writer loads the latest generation itself before publishing its own.
         """
+        if self.snapshots.signature() == self._snapshot_signature:
+            return False
+        if not self._write_lock.acquire(blocking=False):
+            return False
         try:
-            os.makedirs(self.vector_db_path, exist_ok=True)
-
-            # Save vectorizer
-            with open(self.vectorizer_file, 'wb') as f:
-                pickle.dump(self.vectorizer, f)
+            return self._load_current()
+        finally:
+            self._write_lock.release()
 
-            # Save vectors
-            with open(self.vectors_file, 'wb') as f:
-                pickle.dump(self.vectors, f)
-
-            # Save documents
-            with open(self.docs_file, 'wb') as f:
-                pickle.dump(self.documents, f)
-
-        except Exception as e:
-            logger.error(f"Error saving vectors: {str(e)}")
-
-    def _load_vectors(self):
+    def _load_current(self) -> bool:
         """
-        Load vectorizer, vectors and documents from disk
+        Install the generation named by CURRENT unless it is already served; call with _write_lock held
         """
-        try:
-            if (os.path.exists(self.vectorizer_file) and 
-                os.path.exists(self.vectors_file) and 
-                os.path.exists(self.docs_file)):
+        signature = self.snapshots.signature()
+        if signature == self._snapshot_signature:
+            return False
 
-                # Load vectorizer
-                with open(self.vectorizer_file, 'rb') as f:
-                    self.vectorizer = pickle.load(f)
+        try:
+            generation, snapshot_dir = self.snapshots.current()
+            if generation == self.state.generation:
+                self._snapshot_signature = signature
+                return False
 
-                # Load vectors
-                with open(self.vectors_file, 'rb') as f:
-                    self.vectors = pickle.load(f)
+            self._install(IndexState.load(generation, snapshot_dir, self.encoder, dedup_params=self.dedup_params,
+                                          with_bm25=self.with_bm25))
+            self._snapshot_signature = signature
+            logger.info(f"Loaded index generation {generation} with {len(self.state)} documents")
+            return True
 
-                # Load documents
-                with open(self.docs_file, 'rb') as f:
-                    self.documents = pickle.load(f)
+        except Exception as e:
+            logger.error(f"Error loading index generation: {str(e)}")
+            return False
 
-                self.is_fitted = True
-                logger.info(f"Loaded {len(self.documents)} documents from disk")
-            else:
-                logger.info("No existing vector database found, starting fresh")
-                self.vectors = None
-                self.documents = []
-                self.is_fitted = False
+    def _install(self, state: IndexState, keep_deduplicator: bool = False):
+        """
+        Make a fully built state the one searches use; call with _write_lock held
 
-        except Exception as e:
-            logger.error(f"Error loading vectors: {str(e)}")
-            self.vectors = None
-            self.documents = []
-            self.is_fitted = False
+        keep_deduplicator is for a state just published from this process,
+        which the deduplicator already describes.
+        """
+        # A single reference assignment: searches see the old state or the new one
+        self.state = state
+        if not keep_deduplicator:
+            self.deduplicator = None
+        # Entries for older generations can no longer be hit; free them now
+        self.query_cache.clear()
 
     def _is_relevant_content(self, text: str) -> bool:
         """
         Filter out irrelevant content like headers, footers, and boilerplate text
         """
-        text_lower = text.lower()
-
         # Skip very short chunks that are likely headers/footers
         if len(text.strip()) < 50:
             return False
 
-        # Skip chunks that are ONLY contact information (be more lenient)
-        pure_contact_patterns = [
-            'bajaj allianz house, airport road, yerawada, pune',
-            'www.bajajallianz.com',
-            'bagichelp@bajajallianz.co.in',
-            'for more details, log on to:'
-        ]
-
-        # Only reject if text is mostly just contact info
-        is_pure_contact = any(pattern in text_lower for pattern in pure_contact_patterns) and len(text.strip()) < 200
-        if is_pure_contact:
-            return False
+        text_lower = text.lower()
+
+        # Repeated headers/footers (contact details, UIN banners) are stripped
+        # during extraction by DocumentProcessor, so no insurer-specific lists here
 
         # Skip chunks that are just UIN headers without content
         if re.match(r'^uin[\-\s]*[a-z0-9]+\s*$', text_lower.strip()):
             return False
 
-        # Accept chunks with ANY policy-relevant content (be more inclusive)
-        relevant_keywords = [
-            'clause', 'section', 'coverage', 'covered', 'excluded', 'waiting period',
-            'sum insured', 'premium', 'deductible', 'co-pay', 'treatment', 'surgery',
-            'hospitalization', 'medical', 'claim', 'benefit', 'condition', 'terms',
-            'policy', 'insured', 'eligible', 'reimbursement', 'expenses', 'limit',
-            'pre-existing', 'exclusion', 'inclusion', 'cashless', 'network hospital',
-            'procedure', 'operation', 'disease', 'illness', 'injury', 'emergency',
-            'ambulance', 'consultation', 'diagnostic', 'therapy', 'medicine',
-            'rupees', '₹', 'amount', 'cost', 'fee', 'charge', 'payable'
-        ]
+        # Accept if it has relevant content OR medical codes OR substantial text,
+        # checking the cheapest first and stopping at the first that holds
 
-        has_relevant_content = any(keyword in text_lower for keyword in relevant_keywords)
+        # Accept chunks with ANY policy-relevant content (be more inclusive).
+        # One scan, which stops there, also tells whether procedure words occur
+        dictionaries = self.keywords.matching_dictionaries(text_lower, stop_at='relevant_content')
+        if 'relevant_content' in dictionaries:
+            return True
 
-        # Also accept chunks with medical procedure codes or lists (these might be relevant)
-        has_medical_codes = bool(re.search(r'\d+\.\d+|\d+\s+[a-z].*?(surgery|procedure|treatment|removal|repair)', text_lower))
+        # Also accept chunks with medical procedure codes or lists (these might be relevant).
+        # The list pattern rescans the rest of the line from every number, so it
+        # only runs when one of its words occurs at all
+        if re.search(r'\d+\.\d+', text_lower):
+            return True
+        if ('procedure_words' in dictionaries
+                and re.search(r'\d+\s+[a-z].*?(surgery|procedure|treatment|removal|repair)', text_lower)):
+            return True
 
         # Accept chunks with substantial text content (more lenient threshold)
-        has_substantial_text = len([word for word in text.split() if len(word) > 2]) > 5
-
-        # Accept if it has relevant content OR medical codes OR substantial text
-        return has_relevant_content or has_medical_codes or (has_substantial_text and len(text.strip()) > 100)
\ No newline at end of file
+        return len(text.strip()) > 100 and len([word for word in text.split() if len(word) > 2]) > 5
\ No newline at end of file